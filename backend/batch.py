@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Batch maintenance jobs.
+
+pending        Recompute pendingAmount for every member without a manual
+               override. calculate_pending depends on the current month,
+               so stored values go stale when the calendar rolls over;
+               this job runs nightly in the API process.
+search-fields  Backfill the normalized name/phone fields used by
+               /members/search on members created before they existed.
+               Also run in the background when the API starts.
+dates          Convert dates stored as ISO strings to BSON dates. Works
+               in batches and only selects documents that still have a
+               string date, so it can be stopped and re-run at any time.
+               Also run in the background when the API starts, as range
+               queries and keyset pages on a date skip string values.
+reconcile      Rebuild each member's emiPaidCount (and the pendingAmount
+               derived from it) from the payments collection. Members
+               with a payment written in the last RECONCILE_SETTLE_SECONDS,
+               or whose count changes while a chunk is processed, may
+               have a request in flight and are skipped; re-running
+               picks them up.
+
+    python batch.py pending [--chunk-size N]
+    python batch.py search-fields
+    python batch.py dates [--chunk-size N]
+    python batch.py reconcile [--chunk-size N] [--dry-run]
+"""
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Optional
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+
+from database import groups_collection, members_collection, payments_collection, auctions_collection, counters_collection
+from stats import bump, rebuild_stats, merge_deltas, member_deltas
+from utils import search_fields, to_datetime, apply_paid_delta
+from conditional import bump_version
+from jobs import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+PENDING_CHUNK_SIZE = 10_000
+DATES_CHUNK_SIZE = 1000
+RECONCILE_CHUNK_SIZE = 5000
+# Longer than any request takes between moving a paid count and writing the payment
+RECONCILE_SETTLE_SECONDS = 60
+
+# Date fields stored as ISO strings before the move to BSON dates
+DATE_FIELDS = [
+    (members_collection, ["joinDate", "endDate", "createdAt", "updatedAt"]),
+    (payments_collection, ["paymentDate"]),
+    (groups_collection, ["createdAt"]),
+    (auctions_collection, ["createdAt"]),
+]
+PENDING_RECALC_HOUR = os.environ.get("PENDING_RECALC_HOUR", "2")
+NIGHTLY_PENDING_ID = "nightlyPending"
+
+def _join_months(join_dates: list) -> np.ndarray:
+    """Months since 1970-01 for each join date; NaT where missing or unparseable"""
+    try:
+        parsed = np.array(join_dates, dtype="datetime64[us]")
+    except ValueError:
+        parsed = np.array([_parse_date(d) for d in join_dates], dtype="datetime64[us]")
+    return parsed.astype("datetime64[M]")
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+async def _recompute_chunk(chunk: list, emi_by_group: dict, now_month: np.datetime64) -> tuple:
+    """Vectorized calculate_pending over one chunk.
+
+    Returns (changed, pending_delta, overdue_delta, exact); ``exact`` is
+    False when some guarded updates were skipped, as the deltas then
+    include rows that were never written.
+    """
+    emi = np.array([emi_by_group[m["groupId"]] for m in chunk], dtype=float)
+    paid = np.array([m.get("emiPaidCount", 0) or 0 for m in chunk], dtype=float)
+    stored = np.array([m.get("pendingAmount", 0) or 0 for m in chunk], dtype=float)
+    join_months = _join_months([m.get("joinDate") for m in chunk])
+
+    months = (now_month - join_months).astype("timedelta64[M]").astype(float) + 1
+    pending = np.maximum(months * emi - paid * emi, 0)
+    # calculate_pending returns 0 without a join date or an EMI
+    pending[np.isnat(join_months) | (emi == 0)] = 0
+
+    changed = np.flatnonzero(~np.isclose(pending, stored))
+    if len(changed) == 0:
+        return 0, 0.0, 0.0, True
+
+    # Skip members whose paid count moved since they were read
+    updates = [
+        UpdateOne(
+            {"id": chunk[i]["id"], "emiPaidCount": chunk[i].get("emiPaidCount", 0), "manualPendingOverride": {"$ne": True}},
+            {"$set": {"pendingAmount": float(pending[i])}}
+        )
+        for i in changed
+    ]
+    result = await members_collection.bulk_write(updates, ordered=False)
+
+    old_overdue = np.where(stored > emi * 2, stored, 0)
+    new_overdue = np.where(pending > emi * 2, pending, 0)
+    pending_delta = float((pending[changed] - stored[changed]).sum())
+    overdue_delta = float((new_overdue[changed] - old_overdue[changed]).sum())
+    return result.modified_count, pending_delta, overdue_delta, result.modified_count == len(changed)
+
+async def recompute_pending(chunk_size: int = PENDING_CHUNK_SIZE) -> dict:
+    """Recompute pendingAmount for all non-overridden members"""
+    start = time.perf_counter()
+    groups = await groups_collection.find({}, {"_id": 0, "id": 1, "emiAmount": 1}).to_list(None)
+    emi_by_group = {g["id"]: g.get("emiAmount", 0) or 0 for g in groups}
+    now_month = np.datetime64(datetime.now(), "M")
+
+    cursor = members_collection.find(
+        {"manualPendingOverride": {"$ne": True}},
+        {"_id": 0, "id": 1, "groupId": 1, "joinDate": 1, "emiPaidCount": 1, "pendingAmount": 1}
+    ).batch_size(chunk_size)
+
+    scanned = changed = skipped = 0
+    pending_delta = overdue_delta = 0.0
+    exact = True
+    chunk = []
+
+    async def flush():
+        nonlocal changed, pending_delta, overdue_delta, exact
+        chunk_changed, chunk_pending, chunk_overdue, chunk_exact = await _recompute_chunk(chunk, emi_by_group, now_month)
+        changed += chunk_changed
+        pending_delta += chunk_pending
+        overdue_delta += chunk_overdue
+        exact = exact and chunk_exact
+        chunk.clear()
+
+    async for member in cursor:
+        scanned += 1
+        # Members of a missing group have no EMI to derive pending from
+        if member.get("groupId") not in emi_by_group:
+            skipped += 1
+            continue
+        chunk.append(member)
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    if changed:
+        await bump_version("members")
+    if exact:
+        await bump({"totalPending": pending_delta, "overduePending": overdue_delta})
+    else:
+        # A concurrent write beat some updates; their deltas can't be told apart
+        await rebuild_stats()
+
+    return {
+        "scanned": scanned,
+        "changed": changed,
+        "skipped": skipped,
+        "statsRebuilt": not exact,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+async def backfill_search_fields(chunk_size: int = PENDING_CHUNK_SIZE) -> dict:
+    """Set nameLower/nameWords/phoneDigits/phoneReversed on members missing them"""
+    cursor = members_collection.find(
+        {"$or": [{field: {"$exists": False}} for field in ("nameLower", "nameWords", "phoneDigits", "phoneReversed")]},
+        {"_id": 0, "id": 1, "name": 1, "phone": 1}
+    ).batch_size(chunk_size)
+
+    updated = 0
+    updates = []
+    async for member in cursor:
+        updates.append(UpdateOne(
+            {"id": member["id"]},
+            {"$set": search_fields(member.get("name"), member.get("phone"))}
+        ))
+        if len(updates) >= chunk_size:
+            updated += (await members_collection.bulk_write(updates, ordered=False)).modified_count
+            updates = []
+    if updates:
+        updated += (await members_collection.bulk_write(updates, ordered=False)).modified_count
+    if updated:
+        await bump_version("members")
+    return {"updated": updated}
+
+def _converted_dates(doc: dict, fields: list) -> tuple:
+    """($set of converted fields, names of fields that would not parse)"""
+    updates = {}
+    failed = []
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            try:
+                updates[field] = to_datetime(value) if value else None
+            except ValueError:
+                failed.append(field)
+    history = doc.get("bcHistory")
+    if history and any(isinstance(entry.get("transferredAt"), str) for entry in history):
+        try:
+            updates["bcHistory"] = [
+                {**entry, "transferredAt": to_datetime(entry.get("transferredAt"))}
+                for entry in history
+            ]
+        except ValueError:
+            failed.append("bcHistory")
+    return updates, failed
+
+async def migrate_dates(chunk_size: int = DATES_CHUNK_SIZE) -> dict:
+    """Rewrite string dates as BSON dates, one batch of documents at a time"""
+    report = {}
+    for collection, fields in DATE_FIELDS:
+        string_dates = [{field: {"$type": "string"}} for field in fields]
+        if collection is members_collection:
+            string_dates.append({"bcHistory.transferredAt": {"$type": "string"}})
+        projection = {field: 1 for field in fields}
+        if collection is members_collection:
+            projection["bcHistory"] = 1
+
+        converted = failed = 0
+        last_id = ObjectId("0" * 24)
+        while True:
+            # Walking _id keeps a run moving past documents that fail to parse
+            batch = await collection.find(
+                {"_id": {"$gt": last_id}, "$or": string_dates},
+                projection
+            ).sort("_id", 1).limit(chunk_size).to_list(chunk_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            updates = []
+            for doc in batch:
+                changes, bad_fields = _converted_dates(doc, fields)
+                if bad_fields:
+                    failed += 1
+                    logger.warning(f"{collection.name} {doc['_id']}: unparseable {', '.join(bad_fields)}")
+                if changes:
+                    # Leave fields a live write replaced meanwhile to the next run
+                    unchanged = {field: doc[field] for field in changes if field in fields}
+                    updates.append(UpdateOne({"_id": doc["_id"], **unchanged}, {"$set": changes}))
+            if updates:
+                converted += (await collection.bulk_write(updates, ordered=False)).modified_count
+        report[collection.name] = {"converted": converted, "failed": failed}
+
+    if any(counts["converted"] for counts in report.values()):
+        # Daily collection buckets only count payments with BSON dates
+        await rebuild_stats()
+        # Responses render the converted values differently (local time, no offset)
+        await bump_version("groups", "members")
+    return report
+
+async def _reconcile_chunk(chunk: list, emi_by_group: dict, dry_run: bool) -> tuple:
+    """Fix the paid counts of one chunk of members.
+
+    Returns (mismatched, skipped, exact); ``exact`` is False when some
+    guarded updates were beaten by a concurrent write, so the summed
+    deltas can't be applied.
+    """
+    # Payment writers move the paid count (setting updatedAt) before inserting
+    # or deleting the payment, except bulk inserts, which insert first. Anything
+    # touched after this point may be mid-request and is left alone.
+    settled_before = datetime.now() - timedelta(seconds=RECONCILE_SETTLE_SECONDS)
+    # Covered by the memberId_paymentDate_id index
+    counts = await payments_collection.aggregate([
+        {"$match": {"memberId": {"$in": [m["id"] for m in chunk]}}},
+        {"$group": {"_id": "$memberId", "count": {"$sum": 1}, "latest": {"$max": "$paymentDate"}}}
+    ]).to_list(None)
+    paid_by_member = {row["_id"]: row for row in counts}
+
+    def recent(value) -> bool:
+        # Dates not yet migrated from strings predate any live request
+        return isinstance(value, datetime) and value >= settled_before
+
+    updates = []
+    deltas = []
+    skipped = 0
+    for member in chunk:
+        stored = member.get("emiPaidCount", 0) or 0
+        row = paid_by_member.get(member["id"], {})
+        actual = row.get("count", 0)
+        if actual == stored:
+            continue
+        if recent(member.get("updatedAt")) or recent(row.get("latest")):
+            skipped += 1
+            continue
+        emi_amount = emi_by_group.get(member.get("groupId"))
+        after = apply_paid_delta({**member, "emiPaidCount": stored}, actual - stored, emi_amount)
+        changes = {"emiPaidCount": actual, "updatedAt": datetime.now()}
+        if after.get("pendingAmount") != member.get("pendingAmount"):
+            changes["pendingAmount"] = after["pendingAmount"]
+        # Skip members whose paid count moved since they were read
+        updates.append(UpdateOne(
+            {"id": member["id"], "emiPaidCount": member.get("emiPaidCount"), "updatedAt": member.get("updatedAt")},
+            {"$set": changes}
+        ))
+        deltas.append(member_deltas(member, after, emi_amount))
+
+    exact = True
+    if updates and not dry_run:
+        result = await members_collection.bulk_write(updates, ordered=False)
+        exact = result.modified_count == len(updates)
+        if exact:
+            await bump(merge_deltas(*deltas))
+    return len(updates), skipped, exact
+
+async def reconcile_paid_counts(chunk_size: int = RECONCILE_CHUNK_SIZE, dry_run: bool = False) -> dict:
+    """Rebuild emiPaidCount for every member from the payments collection"""
+    start = time.perf_counter()
+    groups = await groups_collection.find({}, {"_id": 0, "id": 1, "emiAmount": 1}).to_list(None)
+    emi_by_group = {g["id"]: g.get("emiAmount", 0) or 0 for g in groups}
+
+    cursor = members_collection.find(
+        {},
+        {"_id": 0, "id": 1, "groupId": 1, "status": 1, "joinDate": 1,
+         "emiPaidCount": 1, "pendingAmount": 1, "manualPendingOverride": 1, "updatedAt": 1}
+    ).batch_size(chunk_size)
+
+    scanned = mismatched = skipped = 0
+    exact = True
+    chunk = []
+
+    async def flush():
+        nonlocal mismatched, skipped, exact
+        chunk_mismatched, chunk_skipped, chunk_exact = await _reconcile_chunk(chunk, emi_by_group, dry_run)
+        mismatched += chunk_mismatched
+        skipped += chunk_skipped
+        exact = exact and chunk_exact
+        chunk.clear()
+
+    async for member in cursor:
+        scanned += 1
+        chunk.append(member)
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    if mismatched and not dry_run:
+        await bump_version("members")
+    if not exact:
+        # Deltas of the chunks that lost a race were not applied
+        await rebuild_stats()
+
+    return {
+        "scanned": scanned,
+        "mismatched": mismatched,
+        "skipped": skipped,
+        "statsRebuilt": not exact,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+def _seconds_until(hour: int) -> float:
+    now = datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def _claim_nightly_run(day: str) -> bool:
+    """True for the one API worker that gets to run the nightly job on ``day``"""
+    try:
+        result = await counters_collection.update_one(
+            {"_id": NIGHTLY_PENDING_ID, "day": {"$ne": day}},
+            {"$set": {"day": day, "worker": WORKER_ID}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another worker already claimed the day
+        return False
+    return result.modified_count > 0 or result.upserted_id is not None
+
+async def run_nightly_pending(hour: int):
+    """Background loop recomputing pending once a day at ``hour``"""
+    while True:
+        await asyncio.sleep(_seconds_until(hour))
+        try:
+            # Every worker schedules the job; concurrent runs would double-count the stats deltas
+            if not await _claim_nightly_run(datetime.now().date().isoformat()):
+                continue
+            result = await recompute_pending()
+            logger.info(f"Nightly pending recompute: {result}")
+        except Exception as e:
+            logger.error(f"Nightly pending recompute failed: {e}")
+
+def start_nightly_pending() -> Optional[asyncio.Task]:
+    """Schedule the nightly job unless PENDING_RECALC_HOUR is 'off'"""
+    if PENDING_RECALC_HOUR.lower() == "off":
+        return None
+    return asyncio.create_task(run_nightly_pending(int(PENDING_RECALC_HOUR)))
+
+async def run_startup_backfills():
+    """Backfills that only select unconverted documents, so every worker may run them"""
+    try:
+        result = await backfill_search_fields()
+        if result["updated"]:
+            logger.info(f"Backfilled search fields: {result}")
+    except Exception as e:
+        logger.error(f"Search field backfill failed: {e}")
+    try:
+        result = await migrate_dates()
+        if any(counts["converted"] or counts["failed"] for counts in result.values()):
+            logger.info(f"Converted string dates: {result}")
+    except Exception as e:
+        logger.error(f"Date migration failed: {e}")
+
+def start_backfills() -> asyncio.Task:
+    return asyncio.create_task(run_startup_backfills())
+
+def main():
+    parser = argparse.ArgumentParser(description="Chit Fund batch maintenance jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pending = commands.add_parser("pending", help="recompute pendingAmount for all members")
+    pending.add_argument("--chunk-size", type=int, default=PENDING_CHUNK_SIZE)
+
+    commands.add_parser("search-fields", help="backfill normalized member search fields")
+
+    dates = commands.add_parser("dates", help="convert ISO string dates to BSON dates")
+    dates.add_argument("--chunk-size", type=int, default=DATES_CHUNK_SIZE)
+
+    reconcile = commands.add_parser("reconcile", help="rebuild emiPaidCount from the payments collection")
+    reconcile.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE)
+    reconcile.add_argument("--dry-run", action="store_true", help="report mismatches without writing")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "pending":
+        result = asyncio.run(recompute_pending(args.chunk_size))
+        print(f"Scanned {result['scanned']} members, updated {result['changed']}, "
+              f"skipped {result['skipped']} without a group in {result['seconds']}s")
+    elif args.command == "search-fields":
+        result = asyncio.run(backfill_search_fields())
+        print(f"Backfilled search fields on {result['updated']} members")
+    elif args.command == "dates":
+        result = asyncio.run(migrate_dates(args.chunk_size))
+        for name, counts in result.items():
+            print(f"{name}: converted {counts['converted']}, unparseable {counts['failed']}")
+    elif args.command == "reconcile":
+        result = asyncio.run(reconcile_paid_counts(args.chunk_size, args.dry_run))
+        action = "would fix" if args.dry_run else "fixed"
+        print(f"Scanned {result['scanned']} members, {action} {result['mismatched']} paid counts in {result['seconds']}s"
+              f" ({result['skipped']} recently active members skipped)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Load test for the API.
+
+Seeds a synthetic dataset straight into MongoDB with bulk inserts, then
+drives the key routes with concurrent async clients and reports p50 /
+p95 / p99 latency, throughput and errors per scenario. Runs go to a
+scratch database, and the JSON report records the commit and dataset so
+runs can be compared across commits with --compare.
+
+Seeding drops every collection in the target database, so the server
+and database are always given explicitly (--mongo-url, --db); the .env
+connection is never used, and database names must start with
+"chitfund_bench".
+
+The app is called in process through httpx's ASGI transport unless
+--base-url points at a running server (which must use the same
+database).
+
+Usage (from backend/):
+    python -m benchmarks.load_test --mongo-url mongodb://localhost:27017 --db chitfund_bench \
+        --groups 1000 --members 100000 --payments 5000000
+    python -m benchmarks.load_test --mongo-url mongodb://localhost:27017 --db chitfund_bench \
+        --skip-seed --requests 2000 --concurrency 50 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+# Benchmarks only ever touch databases with this prefix
+BENCH_DB_PREFIX = "chitfund_bench"
+SEED_BATCH_SIZE = 10_000
+SCENARIOS = [
+    "dashboard-stats",
+    "groups-page",
+    "members-page",
+    "members-of-group",
+    "payments-page",
+    "create-payment",
+    "create-member",
+]
+
+def add_database_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--mongo-url", required=True, help="MongoDB to benchmark against (the .env URL is never used)")
+    parser.add_argument("--db", required=True, help=f"scratch database; must start with {BENCH_DB_PREFIX!r}")
+
+def use_database(parser: argparse.ArgumentParser, args):
+    """Point the app at the benchmark database; must run before ``database`` is imported"""
+    if not args.db.startswith(BENCH_DB_PREFIX):
+        parser.error(f"--db must start with {BENCH_DB_PREFIX!r}, got {args.db!r}")
+    if "database" in sys.modules:
+        raise RuntimeError("database was imported before the benchmark database was chosen")
+    # database.py loads .env without overriding variables that are already set
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def _insert_batches(collection, docs):
+    """Insert an iterable of documents SEED_BATCH_SIZE at a time"""
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= SEED_BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+async def seed(groups: int, members: int, payments: int) -> dict:
+    """Bulk-insert a synthetic dataset shaped like the app's documents"""
+    from database import db, groups_collection, members_collection, payments_collection, ensure_indexes
+    from stats import rebuild_stats
+    from sequences import seed_auction_srno
+    from utils import calculate_pending, search_fields
+
+    if not db.name.startswith(BENCH_DB_PREFIX):
+        raise RuntimeError(f"Refusing to drop collections in {db.name!r}")
+
+    start = time.perf_counter()
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
+    await ensure_indexes()
+
+    rng = random.Random(42)
+    now = datetime.now()
+
+    # Members are spread round-robin, so group i gets members i, i + groups, ...
+    group_docs = []
+    for i in range(groups):
+        total = rng.choice([100_000, 200_000, 500_000, 1_000_000])
+        count = members // groups + (1 if i < members % groups else 0)
+        group_docs.append({
+            "id": str(uuid.uuid4()),
+            "name": f"Group {i:04d}",
+            "totalChitAmount": total,
+            "maxMembers": count + 5,
+            "description": "",
+            "emiAmount": round(total / count) if count else 0,
+            "membersCount": count,
+            "vacancies": 5,
+            "createdAt": now - timedelta(days=rng.randint(0, 900))
+        })
+    await _insert_batches(groups_collection, group_docs)
+
+    member_ids = []
+
+    def member_docs():
+        for i in range(members):
+            group = group_docs[i % groups]
+            join_date = now - timedelta(days=rng.randint(0, 720))
+            paid = rng.randint(0, 24)
+            name = f"Member {i:06d}"
+            phone = f"9{i:09d}"
+            member_id = str(uuid.uuid4())
+            member_ids.append((member_id, group["id"], group["emiAmount"]))
+            yield {
+                "id": member_id,
+                "name": name,
+                "phone": phone,
+                "email": "",
+                "address": "",
+                "groupId": group["id"],
+                "bcHolder": "BENCH",
+                "joinDate": join_date,
+                "endDate": None,
+                "status": "active",
+                "bcHistory": [],
+                "emiPaidCount": paid,
+                "pendingAmount": calculate_pending(join_date, group["emiAmount"], paid),
+                "manualPendingOverride": False,
+                "createdAt": join_date,
+                "updatedAt": join_date,
+                **search_fields(name, phone)
+            }
+    await _insert_batches(members_collection, member_docs())
+
+    def payment_docs():
+        for _ in range(payments):
+            member_id, group_id, emi_amount = member_ids[rng.randrange(len(member_ids))]
+            yield {
+                "id": str(uuid.uuid4()),
+                "groupId": group_id,
+                "memberId": member_id,
+                "amount": emi_amount,
+                "emiNo": rng.randint(1, 24),
+                "paidBy": "cash",
+                "type": "COLLECTION",
+                "paymentDate": now - timedelta(minutes=rng.randint(0, 720 * 24 * 60))
+            }
+    if member_ids:
+        await _insert_batches(payments_collection, payment_docs())
+
+    await rebuild_stats()
+    await seed_auction_srno()
+    return {"groups": groups, "members": members, "payments": payments, "seconds": round(time.perf_counter() - start, 1)}
+
+async def _dataset_size() -> dict:
+    from database import groups_collection, members_collection, payments_collection
+    return {
+        "groups": await groups_collection.estimated_document_count(),
+        "members": await members_collection.estimated_document_count(),
+        "payments": await payments_collection.estimated_document_count()
+    }
+
+async def _sample_ids() -> dict:
+    from database import groups_collection, members_collection
+    groups = await groups_collection.find({"membersCount": {"$gt": 0}}, {"_id": 0, "id": 1}).limit(200).to_list(200)
+    members = await members_collection.find({}, {"_id": 0, "id": 1, "groupId": 1}).limit(1000).to_list(1000)
+    return {"groups": [g["id"] for g in groups], "members": members}
+
+def _request_for(scenario: str, ids: dict, rng: random.Random):
+    """(method, path, json body) for one request of ``scenario``"""
+    if scenario == "dashboard-stats":
+        return "GET", "/api/dashboard/stats", None
+    if scenario == "groups-page":
+        return "GET", "/api/groups/?limit=50", None
+    if scenario == "members-page":
+        return "GET", "/api/members/?limit=100", None
+    if scenario == "members-of-group":
+        return "GET", f"/api/members/group/{rng.choice(ids['groups'])}", None
+    if scenario == "payments-page":
+        return "GET", "/api/payments/?limit=100", None
+    if scenario == "create-payment":
+        member = rng.choice(ids["members"])
+        return "POST", "/api/payments/", {
+            "groupId": member["groupId"], "memberId": member["id"],
+            "amount": 1000, "emiNo": 1, "paidBy": "bench"
+        }
+    if scenario == "create-member":
+        return "POST", "/api/members/", {
+            "name": f"Load {rng.randrange(10**9)}", "phone": f"8{rng.randrange(10**9):09d}",
+            "groupId": rng.choice(ids["groups"]), "bcHolder": "BENCH",
+            "joinDate": datetime.now().isoformat()
+        }
+    raise ValueError(f"Unknown scenario {scenario}")
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, ids: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = requests
+    rng = random.Random(scenario)
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = _request_for(scenario, ids, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+    }
+
+def print_report(report: dict, baseline: dict = None):
+    print(f"commit {report['meta']['commit']}  concurrency {report['meta']['concurrency']}  "
+          f"requests/scenario {report['meta']['requests']}")
+    header = f"{'scenario':<18}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    if baseline:
+        header += f"{'Δ p95':>9}{'Δ req/s':>9}"
+    print(header)
+    for name, row in report["scenarios"].items():
+        line = f"{name:<18}{row['throughput']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['errors']:>8}"
+        old = baseline["scenarios"].get(name) if baseline else None
+        if old:
+            p95 = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0
+            rps = (row["throughput"] - old["throughput"]) / old["throughput"] * 100 if old["throughput"] else 0
+            line += f"{p95:>+8.0f}%{rps:>+8.0f}%"
+        print(line)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_database_args(parser)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--payments", type=int, default=100_000)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the dataset already in --db")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    args = parser.parse_args()
+    use_database(parser, args)
+
+    dataset = None
+    if not args.skip_seed:
+        dataset = await seed(args.groups, args.members, args.payments)
+        print(f"Seeded {dataset['groups']} groups, {dataset['members']} members, "
+              f"{dataset['payments']} payments in {dataset['seconds']}s")
+    if args.seed_only:
+        return
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from server import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    ids = await _sample_ids()
+    if not ids["groups"] or not ids["members"]:
+        print("Dataset is empty; run without --skip-seed first")
+        sys.exit(1)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "dataset": dataset or await _dataset_size(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {}
+    }
+    async with client:
+        for scenario in args.scenarios.split(","):
+            report["scenarios"][scenario] = await run_scenario(client, scenario, ids, args.requests, args.concurrency)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+    print_report(report, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+if __name__ == "__main__":
+    asyncio.run(main())
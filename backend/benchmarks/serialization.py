@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for large member lists.
+
+Compares FastAPI's default response handling (validate against
+response_model, dump to Python, json.dumps) with the TypeAdapter fast
+path in serialization.py, and checks both produce the same JSON. Needs no
+database.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --members 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from models import Member  # noqa: E402
+from serialization import dump_model_list  # noqa: E402
+
+def make_members(count: int) -> List[dict]:
+    """Member documents shaped like the ones stored in MongoDB"""
+    now = datetime.now()
+    group_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Member {i}",
+            "phone": f"98{i:08d}",
+            "email": "",
+            "address": f"{i} Market Road",
+            "groupId": group_id,
+            "bcHolder": "BENCH",
+            "joinDate": now - timedelta(days=i % 900),
+            "endDate": None,
+            "status": "active" if i % 7 else "inactive",
+            "bcHistory": [
+                {"bcName": f"BC {j}", "transferredAt": now - timedelta(days=30 * j)}
+                for j in range(i % 3)
+            ],
+            "emiPaidCount": i % 24,
+            "pendingAmount": float((i % 12) * 5000),
+            "manualPendingOverride": False,
+            "createdAt": now,
+            "updatedAt": now,
+            "nameLower": f"member {i}",
+            "phoneDigits": f"98{i:08d}",
+        }
+        for i in range(count)
+    ]
+
+async def fastapi_default(field, docs: List[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=docs, is_coroutine=True)
+    return JSONResponse(content).body
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_members(args.members)
+    field = create_response_field(name="Response", type_=List[Member])
+    loop = asyncio.new_event_loop()
+
+    baseline_body = loop.run_until_complete(fastapi_default(field, docs))
+    fast_body = dump_model_list(Member, docs)
+    if json.loads(baseline_body) != json.loads(fast_body):
+        print("MISMATCH: fast path output differs from response_model output")
+        sys.exit(1)
+
+    baseline = best_of(args.repeat, lambda: loop.run_until_complete(fastapi_default(field, docs)))
+    fast = best_of(args.repeat, lambda: dump_model_list(Member, docs))
+    loop.close()
+
+    print(f"{args.members} members, best of {args.repeat}")
+    print(f"  response_model + json.dumps: {baseline * 1000:8.1f} ms")
+    print(f"  TypeAdapter.dump_json:       {fast * 1000:8.1f} ms")
+    print(f"  speedup: {baseline / fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
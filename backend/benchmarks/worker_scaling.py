@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Throughput versus worker count.
+
+Starts the API with run.py at each requested worker count, drives read
+scenarios from several load-generator processes (so the client is not the
+bottleneck) and reports requests/s, p95 latency and the speedup over the
+first worker count. Servers are stopped with SIGTERM, which also
+exercises the graceful drain.
+
+Uses the dataset in --db (which, like load_test, must start with
+"chitfund_bench"; the .env connection is never used); seed it first
+with ``python -m benchmarks.load_test --seed-only``. Scaling is bounded
+by the cores on this machine, shared with the load generators, and by
+MongoDB itself.
+
+Usage (from backend/):
+    python -m benchmarks.worker_scaling --mongo-url mongodb://localhost:27017 --db chitfund_bench \
+        --workers 1,2,4 --requests 4000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks.load_test import (  # noqa: E402
+    add_database_args, use_database, _git_commit, _percentile, _request_for, _sample_ids
+)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+READ_SCENARIOS = ["members-page", "payments-page", "members-of-group", "groups-page"]
+STARTUP_TIMEOUT = 60
+
+async def _drive(base_url: str, scenario: str, ids: dict, requests: int, concurrency: int, seed: int) -> dict:
+    """Raw latencies for ``requests`` requests from one load-generator process"""
+    latencies = []
+    errors = 0
+    remaining = requests
+    rng = random.Random(f"{scenario}-{seed}")
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                method, path, body = _request_for(scenario, ids, rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+
+        started = time.time()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return {"latencies": latencies, "errors": errors, "started": started, "finished": time.time()}
+
+def _client_process(base_url, scenario, ids, requests, concurrency, seed) -> dict:
+    return asyncio.run(_drive(base_url, scenario, ids, requests, concurrency, seed))
+
+def run_scenario(pool, base_url: str, scenario: str, ids: dict, requests: int, concurrency: int, clients: int) -> dict:
+    """Split one scenario across the client processes and merge their latencies"""
+    futures = [
+        pool.submit(_client_process, base_url, scenario, ids,
+                    requests // clients + (1 if i < requests % clients else 0),
+                    max(concurrency // clients, 1), i)
+        for i in range(clients)
+    ]
+    parts = [future.result() for future in futures]
+    latencies = sorted(l for part in parts for l in part["latencies"])
+    elapsed = max(p["finished"] for p in parts) - min(p["started"] for p in parts)
+    return {
+        "requests": len(latencies),
+        "errors": sum(p["errors"] for p in parts),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+    }
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "run.py", "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+
+def wait_until_ready(base_url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/api/", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {STARTUP_TIMEOUT}s")
+
+def stop_server(process: subprocess.Popen) -> float:
+    """SIGTERM and wait for the drain; returns the shutdown time"""
+    start = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    return time.perf_counter() - start
+
+def print_report(report: dict):
+    print(f"commit {report['meta']['commit']}  cores {report['meta']['cores']}  clients {report['meta']['clients']}  "
+          f"concurrency {report['meta']['concurrency']}  requests/scenario {report['meta']['requests']}")
+    print(f"{'workers':<9}{'scenario':<18}{'req/s':>9}{'p95 ms':>9}{'errors':>8}{'speedup':>9}")
+    baseline = {}
+    for run in report["runs"]:
+        for name, row in run["scenarios"].items():
+            base = baseline.setdefault(name, row["throughput"])
+            speedup = row["throughput"] / base if base else 0
+            print(f"{run['workers']:<9}{name:<18}{row['throughput']:>9}{row['p95_ms']:>9}{row['errors']:>8}{speedup:>8.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_database_args(parser)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--scenarios", default=",".join(READ_SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario and worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="total concurrent requests")
+    parser.add_argument("--clients", type=int, default=max((os.cpu_count() or 2) // 2, 1),
+                        help="load-generator processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    # The servers started below inherit MONGO_URL / DB_NAME from this process
+    use_database(parser, args)
+
+    ids = asyncio.run(_sample_ids())
+    if not ids["groups"] or not ids["members"]:
+        print("Dataset is empty; run `python -m benchmarks.load_test --seed-only` first")
+        sys.exit(1)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cores": os.cpu_count(),
+            "clients": args.clients,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "runs": []
+    }
+    with ProcessPoolExecutor(args.clients, mp_context=get_context("spawn")) as pool:
+        for workers in (int(w) for w in args.workers.split(",")):
+            server = start_server(workers, args.port)
+            try:
+                wait_until_ready(base_url, server)
+                run = {"workers": workers, "scenarios": {}}
+                for scenario in args.scenarios.split(","):
+                    run["scenarios"][scenario] = run_scenario(
+                        pool, base_url, scenario, ids, args.requests, args.concurrency, args.clients
+                    )
+            finally:
+                shutdown = stop_server(server)
+            run["shutdownSeconds"] = round(shutdown, 2)
+            report["runs"].append(run)
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
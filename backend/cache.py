@@ -0,0 +1,174 @@
+"""
+In-process read-through cache for group documents.
+
+Read paths mostly need a group's emiAmount, and groups change rarely, so
+group documents are cached per worker with an LRU bound and a TTL.
+Concurrent misses for the same key share one query (single flight).
+Entries are invalidated by the group write paths; other workers can be
+told through ``add_invalidation_listener`` or, on a replica set, by
+enabling GROUP_CACHE_WATCH which tails the groups change stream.
+
+Until then another worker's entry can be up to GROUP_CACHE_TTL seconds
+stale. Write paths that persist something derived from a group
+(pendingAmount, the stats deltas) therefore use ``get_group_entry``, which
+also returns the ``groups`` version the entry was loaded at, and after the
+write hand the versions returned by their ``bump`` to ``revalidate_group``.
+Every group write bumps that version, so an unchanged version means the
+entry was current when used; otherwise the group is re-read and the
+caller corrects what it derived.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+import asyncio
+import logging
+import os
+import time
+
+from database import groups_collection
+from conditional import get_versions
+
+logger = logging.getLogger(__name__)
+
+GROUP_CACHE_SIZE = int(os.environ.get("GROUP_CACHE_SIZE", "1024"))
+GROUP_CACHE_TTL = float(os.environ.get("GROUP_CACHE_TTL", "30"))
+GROUP_CACHE_WATCH = os.environ.get("GROUP_CACHE_WATCH", "0") == "1"
+
+class AsyncTTLCache:
+    """LRU + TTL cache with single-flight loading"""
+
+    def __init__(self, loader: Callable[[Any], Awaitable[Any]], maxsize: int, ttl: float):
+        self._loader = loader
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._listeners: List[Callable[[Optional[Any]], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    async def get(self, key):
+        entry = self._data.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key))
+            self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _load(self, key):
+        self.loads += 1
+        try:
+            value = await self._loader(key)
+        except BaseException:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+            raise
+        # An invalidation during the load drops this future; don't cache its result
+        if self._inflight.get(key) is asyncio.current_task():
+            del self._inflight[key]
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def invalidate(self, key=None, propagate: bool = True):
+        """Drop one key (or everything when key is None) and notify listeners"""
+        self.invalidations += 1
+        if key is None:
+            self._data.clear()
+            self._inflight.clear()
+        else:
+            self._data.pop(key, None)
+            self._inflight.pop(key, None)
+        if propagate:
+            for listener in self._listeners:
+                try:
+                    listener(key)
+                except Exception as e:
+                    logger.error(f"Cache invalidation listener failed: {e}")
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[Any]], None]):
+        """Hook for cross-worker invalidation (e.g. publish to a message bus).
+
+        Receivers should call ``invalidate(key, propagate=False)``.
+        """
+        self._listeners.append(listener)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self._maxsize,
+            "ttl": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0
+        }
+
+class GroupEntry(NamedTuple):
+    group: Optional[dict]
+    version: int
+
+    @property
+    def emi_amount(self) -> Optional[float]:
+        """The group's EMI, or None when the group does not exist"""
+        return self.group.get("emiAmount", 0) if self.group else None
+
+async def _load_group(group_id: str) -> GroupEntry:
+    # The version is read first, so a write landing in between leaves the entry tagged as older
+    versions = await get_versions("groups")
+    group = await groups_collection.find_one({"id": group_id}, {"_id": 0})
+    return GroupEntry(group, versions["groups"])
+
+group_cache = AsyncTTLCache(_load_group, GROUP_CACHE_SIZE, GROUP_CACHE_TTL)
+
+async def get_group(group_id: str) -> Optional[dict]:
+    """Cached group document (a shallow copy; treat as read-only)"""
+    entry = await group_cache.get(group_id)
+    return dict(entry.group) if entry.group else None
+
+async def get_group_entry(group_id: str) -> GroupEntry:
+    """Cached group with the ``groups`` version it was loaded at, for write paths"""
+    return await group_cache.get(group_id)
+
+async def revalidate_group(group_id: str, entry: GroupEntry, versions: dict) -> GroupEntry:
+    """``entry`` if no group has changed since it was loaded, else a fresh one.
+
+    ``versions`` are those returned by the bump that followed the write.
+    """
+    if versions.get("groups", 0) == entry.version:
+        return entry
+    group_cache.invalidate(group_id, propagate=False)
+    return await group_cache.get(group_id)
+
+def invalidate_group(group_id: str):
+    group_cache.invalidate(group_id)
+
+async def watch_group_changes():
+    """Clear the cache on any change to the groups collection (replica sets only)"""
+    while True:
+        try:
+            async with groups_collection.watch() as stream:
+                async for _ in stream:
+                    group_cache.invalidate(propagate=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Group change stream failed, retrying: {e}")
+            group_cache.invalidate(propagate=False)
+            await asyncio.sleep(5)
+
+def start_group_watch() -> Optional[asyncio.Task]:
+    if not GROUP_CACHE_WATCH:
+        return None
+    return asyncio.create_task(watch_group_changes())
@@ -0,0 +1,65 @@
+"""
+Conditional GET support with weak ETags.
+
+Each cached resource is tagged with a version counter for the collection
+it is built from. Writes bump the counter after they land, and a GET whose
+If-None-Match still matches gets a 304 after one point read of the
+counters document, skipping the query and serialization. The counters
+live in MongoDB rather than in process so that all API workers agree on
+them. The same document holds the dashboard counters (see stats.py), so
+a write path can record its stats and bump its versions in one update.
+"""
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+from typing import Any, Optional, Sequence
+
+from database import counters_collection
+
+VERSIONS_ID = "versions"
+
+# Per-route Cache-Control: always revalidate, and keep member data out of shared caches
+LIST_CACHE_CONTROL = "private, no-cache"
+STATS_CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+async def bump_version(*names: str, inc: Optional[dict] = None) -> dict:
+    """Mark collections as changed; call after the write has been applied.
+
+    ``inc`` adds increments of other fields of the versions document to the
+    same update. Returns the versions as they are after it.
+    """
+    return await counters_collection.find_one_and_update(
+        {"_id": VERSIONS_ID},
+        {"$inc": {**{name: 1 for name in names}, **(inc or {})}},
+        projection={"_id": 0, "dashboard": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+async def get_versions(*names: str) -> dict:
+    doc = await counters_collection.find_one({"_id": VERSIONS_ID}, {n: 1 for n in names})
+    return {n: doc.get(n, 0) if doc else 0 for n in names}
+
+async def make_etag(name: str, *extra: Any, depends: Sequence[str] = ()) -> str:
+    """Weak ETag for the current version of a collection, and of any it ``depends`` on"""
+    versions = await get_versions(name, *depends)
+    return 'W/"' + "-".join(str(part) for part in (name, *versions.values(), *extra)) + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of If-None-Match against ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def with_cache_headers(result, response: Response, etag: str, cache_control: str):
+    """Tag a route result, whether it is a model/list or a ready-made Response"""
+    target = result if isinstance(result, Response) else response
+    target.headers["ETag"] = etag
+    target.headers["Cache-Control"] = cache_control
+    return result
@@ -1,14 +1,60 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+import asyncio
 import os
+import logging
 from dotenv import load_dotenv
 from pathlib import Path
 
+from instrumentation import command_timer, pool_monitor
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+logger = logging.getLogger(__name__)
+
+# Pool and wire settings; unset variables leave the driver (or URI) default.
+# Each API worker has its own pool, so a deployment opens up to
+# workers x MONGO_MAX_POOL_SIZE connections per server.
+CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    # e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+    "compressors": ("MONGO_COMPRESSORS", str),
+}
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def client_options() -> dict:
+    options = {}
+    for option, (variable, cast) in CLIENT_OPTIONS.items():
+        value = os.environ.get(variable)
+        if value:
+            options[option] = cast(value)
+    return options
+
+def list_read_preference():
+    """Read preference for list and report reads (MONGO_READ_PREFERENCE, MONGO_MAX_STALENESS_SECONDS)"""
+    mode = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"MONGO_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}, not {mode!r}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "-1")))
+
 # MongoDB connection
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[command_timer, pool_monitor], **client_options())
 db = client[os.environ.get('DB_NAME', 'chitfund_db')]
 
 # Collections
@@ -16,6 +62,85 @@ groups_collection = db.groups
 members_collection = db.members
 payments_collection = db.payments
 auctions_collection = db.auctions
+stats_collection = db.stats
+counters_collection = db.counters
+jobs_collection = db.jobs
+
+# Handles for list, search, export and report reads, which tolerate lag and
+# may go to secondaries. Reads that feed a write, or that are tagged with an
+# ETag version, stay on the primary: a version read from one server cannot
+# vouch for data read from another.
+LIST_READ_PREFERENCE = list_read_preference()
+members_read_collection = members_collection.with_options(read_preference=LIST_READ_PREFERENCE)
+payments_read_collection = payments_collection.with_options(read_preference=LIST_READ_PREFERENCE)
+auctions_read_collection = auctions_collection.with_options(read_preference=LIST_READ_PREFERENCE)
+
+# Indexes backing the hot-path queries; create_indexes is a no-op for existing ones
+INDEXES = {
+    groups_collection: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("createdAt", ASCENDING), ("id", ASCENDING)], name="createdAt_id"),
+    ],
+    members_collection: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("groupId", ASCENDING), ("status", ASCENDING)], name="groupId_status"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("createdAt", ASCENDING), ("id", ASCENDING)], name="createdAt_id"),
+        IndexModel([("pendingAmount", ASCENDING), ("id", ASCENDING)], name="pendingAmount_id"),
+        IndexModel([("nameLower", ASCENDING), ("id", ASCENDING)], name="nameLower_id"),
+        IndexModel([("nameWords", ASCENDING)], name="nameWords"),
+        IndexModel([("phoneDigits", ASCENDING)], name="phoneDigits"),
+        IndexModel([("phoneReversed", ASCENDING)], name="phoneReversed"),
+        IndexModel([("joinDate", ASCENDING)], name="joinDate"),
+        IndexModel([("groupId", ASCENDING), ("pendingAmount", ASCENDING), ("id", ASCENDING)], name="groupId_pendingAmount_id"),
+    ],
+    payments_collection: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("memberId", ASCENDING), ("paymentDate", ASCENDING), ("id", ASCENDING)], name="memberId_paymentDate_id"),
+        IndexModel([("groupId", ASCENDING)], name="groupId"),
+        IndexModel([("paymentDate", ASCENDING), ("id", ASCENDING)], name="paymentDate_id"),
+    ],
+    auctions_collection: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("srNo", DESCENDING)], name="srNo_unique", unique=True),
+        IndexModel([("groupNo", ASCENDING), ("srNo", ASCENDING), ("id", ASCENDING)], name="groupNo_srNo_id"),
+    ],
+    jobs_collection: [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("leaseUntil", ASCENDING)], name="status_leaseUntil"),
+    ],
+}
+
+async def ensure_indexes():
+    """Create all indexes, logging (not raising) per-collection failures"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await collection.create_indexes(indexes)
+        except PyMongoError as e:
+            # e.g. duplicate srNo values left by concurrent creates
+            logger.error(f"Failed to create indexes on {collection.name}: {e}")
+
+async def warm_pool():
+    """Open connections before the first request by running concurrent pings.
+
+    Opens up to MONGO_WARM_CONNECTIONS (default MONGO_MIN_POOL_SIZE, at least one)
+    to the primary, and as many to the list read preference's servers when
+    that is not the primary. Returns how many pings succeeded; failures are
+    logged, not raised, so an unreachable cluster doesn't stop the app from
+    starting and the pool connects on demand once it is back.
+    """
+    count = max(int(os.environ.get("MONGO_WARM_CONNECTIONS") or os.environ.get("MONGO_MIN_POOL_SIZE") or 1), 1)
+    pings = [db.command("ping") for _ in range(count)]
+    if not isinstance(LIST_READ_PREFERENCE, Primary):
+        pings += [db.command("ping", read_preference=LIST_READ_PREFERENCE) for _ in range(count)]
+    results = await asyncio.gather(*pings, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        if not isinstance(error, PyMongoError):
+            raise error
+    if errors:
+        logger.error(f"Failed to warm the connection pool ({len(errors)} of {len(pings)} pings): {errors[0]}")
+    return len(pings) - len(errors)
 
 async def close_db():
     client.close()
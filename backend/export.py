@@ -0,0 +1,92 @@
+"""
+Streaming NDJSON / CSV export over an async Motor cursor.
+
+Documents are pulled from MongoDB in bounded batches and written out as
+they arrive, so memory stays flat regardless of collection size.
+"""
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Callable, List, Optional
+import csv
+import io
+import json
+
+from utils import to_datetime
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = ("ndjson", "csv")
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def date_range_query(
+    field: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    normalize: Callable[[datetime], datetime] = to_datetime
+) -> dict:
+    """Inclusive range filter on a BSON date field.
+
+    ``normalize`` must turn the bounds into the form the field's values
+    were stored in: to_datetime (UTC) for dates sent by the browser,
+    to_local_datetime for server timestamps.
+    """
+    bounds = {}
+    if start:
+        bounds["$gte"] = normalize(start)
+    if end:
+        bounds["$lte"] = normalize(end)
+    return {field: bounds} if bounds else {}
+
+async def _ndjson_chunks(cursor):
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=_json_default))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+async def _csv_chunks(cursor, columns: List[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(column, "")) for column in columns])
+        rows += 1
+        if rows >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+def stream_export(collection, query: dict, columns: List[str], fmt: str, filename: str) -> StreamingResponse:
+    """Stream ``collection`` documents matching ``query`` as NDJSON or CSV"""
+    # Only the model fields: derived fields such as the search keys stay internal
+    projection = {"_id": 0, **{column: 1 for column in columns}}
+    cursor = collection.find(query, projection).batch_size(EXPORT_BATCH_SIZE)
+
+    if fmt == "csv":
+        body = _csv_chunks(cursor, columns)
+        media_type = "text/csv"
+    else:
+        body = _ndjson_chunks(cursor)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
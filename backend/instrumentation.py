@@ -0,0 +1,305 @@
+"""
+Request and MongoDB instrumentation.
+
+``TimingMiddleware`` times every HTTP request per route template and adds
+a ``Server-Timing`` header (total time, time in MongoDB, query count,
+time waiting for a pooled connection).
+``CommandTimer`` is a PyMongo command listener recording per-collection
+command counts, durations and documents returned. Motor runs PyMongo on
+an executor with a copy of the caller's context, so commands are charged
+to the request that issued them through a context variable.
+``PoolMonitor`` records how long requests wait to check a connection out
+of the pool, and how many connections are open and in use per server.
+
+Everything is kept in process, so with several workers each has its own
+counters, and rendered in Prometheus text format by ``render_metrics``
+for /api/admin/metrics.
+"""
+from pymongo import monitoring
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100]
+
+_lock = threading.Lock()
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, labels: List[str], buckets: List[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, label_values: Tuple, value: float):
+        with _lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for label_values, counts, total, count in sorted(items):
+            labels = _labels(self.labels, label_values)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: List[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._series: Dict[Tuple, float] = {}
+
+    def inc(self, label_values: Tuple, amount: float = 1):
+        with _lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with _lock:
+            items = sorted(self._series.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+class Gauge(Counter):
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: List[str], values: Tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_mongo_commands", "MongoDB commands issued per HTTP request",
+    ["method", "route"], QUERY_COUNT_BUCKETS
+)
+COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection",
+    ["collection", "command"], LATENCY_BUCKETS
+)
+COMMAND_DOCUMENTS = Counter(
+    "mongo_documents_returned_total", "Documents returned by find/aggregate/getMore",
+    ["collection", "command"]
+)
+COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands",
+    ["collection", "command"]
+)
+
+POOL_WAIT = Histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check out a pooled connection",
+    ["address"], LATENCY_BUCKETS
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed (e.g. waitQueueTimeoutMS)",
+    ["address", "reason"]
+)
+POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "Open pooled connections",
+    ["address"]
+)
+POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_checked_out", "Pooled connections currently in use",
+    ["address"]
+)
+
+class RequestStats:
+    """MongoDB work charged to one HTTP request"""
+
+    def __init__(self):
+        self.commands = 0
+        self.db_seconds = 0.0
+        self.documents = 0
+        self.pool_wait_seconds = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# Commands that name their collection in a field other than the command name
+_COLLECTION_FIELDS = {"getMore": "collection"}
+# Reply paths holding returned documents
+_BATCH_FIELDS = ("firstBatch", "nextBatch")
+
+class CommandTimer(monitoring.CommandListener):
+    """Per-collection command timings, also charged to the current request"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, Optional[RequestStats]]] = {}
+
+    def started(self, event):
+        field = _COLLECTION_FIELDS.get(event.command_name, event.command_name)
+        collection = event.command.get(field)
+        if not isinstance(collection, str):
+            collection = "-"
+        with _lock:
+            self._pending[(event.request_id, event.connection_id)] = (collection, _request_stats.get())
+
+    def _finish(self, event) -> Tuple[str, Optional[RequestStats]]:
+        with _lock:
+            return self._pending.pop((event.request_id, event.connection_id), ("-", None))
+
+    def succeeded(self, event):
+        collection, stats = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        documents = 0
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            for field in _BATCH_FIELDS:
+                if field in cursor:
+                    documents = len(cursor[field])
+        COMMAND_LATENCY.observe((collection, event.command_name), seconds)
+        if documents:
+            COMMAND_DOCUMENTS.inc((collection, event.command_name), documents)
+        if stats:
+            with _lock:
+                stats.commands += 1
+                stats.db_seconds += seconds
+                stats.documents += documents
+
+    def failed(self, event):
+        collection, stats = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        COMMAND_LATENCY.observe((collection, event.command_name), seconds)
+        COMMAND_FAILURES.inc((collection, event.command_name))
+        if stats:
+            with _lock:
+                stats.commands += 1
+                stats.db_seconds += seconds
+
+command_timer = CommandTimer()
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool checkout waits and pool size"""
+
+    def __init__(self):
+        # Checkouts block the executor thread that started them
+        self._checkout_started = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+
+    def _record_wait(self, event):
+        start = getattr(self._checkout_started, "value", None)
+        self._checkout_started.value = None
+        waited = time.perf_counter() - start if start is not None else 0.0
+        POOL_WAIT.observe((_address(event),), waited)
+        stats = _request_stats.get()
+        if stats:
+            with _lock:
+                stats.pool_wait_seconds += waited
+
+    def connection_checked_out(self, event):
+        self._record_wait(event)
+        POOL_CHECKED_OUT.inc((_address(event),))
+
+    def connection_check_out_failed(self, event):
+        self._record_wait(event)
+        POOL_CHECKOUT_FAILURES.inc((_address(event), event.reason))
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.inc((_address(event),), -1)
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc((_address(event),))
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.inc((_address(event),), -1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+pool_monitor = PoolMonitor()
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class TimingMiddleware:
+    """Record request latency and MongoDB usage; add a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                header = (
+                    f'app;dur={elapsed_ms:.1f}, '
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.commands} queries", '
+                    f'pool;dur={stats.pool_wait_seconds * 1000:.1f};desc="connection wait"'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = _route_template(scope)
+            REQUEST_LATENCY.observe((scope["method"], route, status), time.perf_counter() - start)
+            REQUEST_QUERIES.observe((scope["method"], route), stats.commands)
+
+METRICS = [
+    REQUEST_LATENCY, REQUEST_QUERIES, COMMAND_LATENCY, COMMAND_DOCUMENTS, COMMAND_FAILURES,
+    POOL_WAIT, POOL_CHECKOUT_FAILURES, POOL_CONNECTIONS, POOL_CHECKED_OUT
+]
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
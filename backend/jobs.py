@@ -0,0 +1,249 @@
+"""
+Background jobs persisted in the ``jobs`` collection.
+
+A job document records its kind, parameters, status and progress, so it
+can be polled at /api/jobs/{id} and picked up again after a restart. A
+worker runs a job only while it holds the job's lease (``leaseUntil``),
+renewed after every batch; a sweeper in each API process claims jobs
+whose lease has expired, i.e. whose worker died or shut down. Job steps
+are written to be safe to repeat.
+
+Kinds:
+
+delete-group  Delete a group, then its members (each batch after their
+              payments) and its remaining payments in batches,
+              updating the dashboard counters as each batch goes. When a
+              batch's counters can't be attributed (see _delete_batches)
+              the stats are rebuilt once the job ends.
+"""
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import os
+import uuid
+
+from database import jobs_collection, groups_collection, members_collection, payments_collection
+from stats import bump, merge_deltas, member_deltas, payment_deltas, record_group_deleted, rebuild_stats
+from cache import invalidate_group
+from conditional import bump_version
+
+logger = logging.getLogger(__name__)
+
+JOB_BATCH_SIZE = 1000
+JOB_LEASE_SECONDS = 60
+JOB_SWEEP_SECONDS = 30
+WORKER_ID = f"{os.uname().nodename}:{os.getpid()}"
+
+# Jobs running in this process
+_running = {}
+
+async def create_job(kind: str, params: dict) -> dict:
+    """Persist a pending job leased to this process; run it with ``start_job``"""
+    now = datetime.now()
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "params": params,
+        "status": "pending",
+        "progress": {},
+        "error": None,
+        "createdAt": now,
+        "updatedAt": now,
+        "finishedAt": None,
+        "owner": WORKER_ID,
+        "leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS)
+    }
+    await jobs_collection.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+async def cancel_job(job: dict, reason: str):
+    """Drop a job that was created but should not run"""
+    await _finish(job, "cancelled", reason)
+
+async def _claim(job_id: str) -> Optional[dict]:
+    """Take the lease on an unfinished job that is ours or whose lease expired"""
+    now = datetime.now()
+    query = {
+        "id": job_id,
+        "status": {"$in": ["pending", "running"]},
+        "$or": [{"owner": WORKER_ID}, {"leaseUntil": {"$lte": now}}]
+    }
+    return await jobs_collection.find_one_and_update(
+        query,
+        {"$set": {
+            "status": "running",
+            "owner": WORKER_ID,
+            "leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updatedAt": now
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _checkpoint(job: dict, **progress):
+    """Save progress and renew the lease; raises if the lease was lost"""
+    job["progress"].update(progress)
+    now = datetime.now()
+    result = await jobs_collection.update_one(
+        {"id": job["id"], "owner": WORKER_ID},
+        {"$set": {
+            "progress": job["progress"],
+            "leaseUntil": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updatedAt": now
+        }}
+    )
+    if result.matched_count == 0:
+        raise RuntimeError(f"Lost lease on job {job['id']}")
+
+async def _finish(job: dict, status: str, error: Optional[str] = None):
+    now = datetime.now()
+    await jobs_collection.update_one(
+        {"id": job["id"], "owner": WORKER_ID},
+        {"$set": {"status": status, "error": error, "finishedAt": now, "updatedAt": now, "leaseUntil": now}}
+    )
+
+async def _delete_batches(
+    job: dict,
+    collection,
+    query: dict,
+    projection: dict,
+    deltas_for,
+    counter: str,
+    before_batch=None
+):
+    """Delete matching documents JOB_BATCH_SIZE at a time, bumping stats per batch.
+
+    ``before_batch`` is awaited with a batch's ids before it is deleted, so
+    a resumed job finds the batch again if it died in between. A batch's
+    ids are checkpointed before it is deleted. The deltas are only
+    applied when the delete removed the whole batch; if a request deleted
+    some of its documents first (and recorded them itself), or a previous
+    run died between a delete and its bump, the job asks for a stats
+    rebuild instead.
+    """
+    in_flight = job["progress"].get("inFlight")
+    if in_flight and in_flight["counter"] == counter:
+        remaining = await collection.count_documents({"id": {"$in": in_flight["ids"]}})
+        if remaining < len(in_flight["ids"]):
+            job["progress"]["rebuildStats"] = True
+        await _checkpoint(job, inFlight=None)
+
+    while True:
+        batch = await collection.find(query, projection).limit(JOB_BATCH_SIZE).to_list(JOB_BATCH_SIZE)
+        if not batch:
+            return
+        ids = [doc["id"] for doc in batch]
+        if before_batch:
+            await before_batch(ids)
+        await _checkpoint(job, inFlight={"counter": counter, "ids": ids})
+        result = await collection.delete_many({"id": {"$in": ids}})
+        if result.deleted_count == len(batch):
+            await bump(merge_deltas(*(deltas_for(doc) for doc in batch)))
+        else:
+            job["progress"]["rebuildStats"] = True
+        await _checkpoint(job, inFlight=None, **{counter: job["progress"].get(counter, 0) + result.deleted_count})
+
+async def _delete_group(job: dict):
+    group = job["params"]["group"]
+    group_id = group["id"]
+
+    # Repeats are harmless: only the first run deletes and records the group
+    result = await groups_collection.delete_one({"id": group_id})
+    invalidate_group(group_id)
+    if result.deleted_count:
+        await record_group_deleted(group)
+        await bump_version("groups")
+
+    if "membersTotal" not in job["progress"]:
+        members_total, payments_total = await asyncio.gather(
+            members_collection.count_documents({"groupId": group_id}),
+            payments_collection.count_documents({"groupId": group_id})
+        )
+        await _checkpoint(job, membersTotal=members_total, paymentsTotal=payments_total)
+
+    def delete_payments(query: dict):
+        return _delete_batches(
+            job, payments_collection, query,
+            {"_id": 0, "id": 1, "amount": 1, "paymentDate": 1},
+            lambda payment: payment_deltas(payment.get("amount", 0), payment.get("paymentDate"), sign=-1),
+            "paymentsDeleted"
+        )
+
+    # Payments are also found through their member, in case their own groupId is wrong or missing
+    emi_amount = group.get("emiAmount", 0)
+    await _delete_batches(
+        job, members_collection, {"groupId": group_id},
+        {"_id": 0, "id": 1, "status": 1, "pendingAmount": 1},
+        lambda member: member_deltas(member, None, emi_amount),
+        "membersDeleted",
+        before_batch=lambda member_ids: delete_payments({"memberId": {"$in": member_ids}})
+    )
+    await bump_version("members")
+    await delete_payments({"groupId": group_id})
+    if job["progress"].get("rebuildStats"):
+        await rebuild_stats()
+
+JOB_HANDLERS = {
+    "delete-group": _delete_group,
+}
+
+async def run_job(job_id: str):
+    """Run a job if its lease can be taken; records the outcome on the job"""
+    job = await _claim(job_id)
+    if not job:
+        return
+    try:
+        await JOB_HANDLERS[job["kind"]](job)
+    except asyncio.CancelledError:
+        # Release the lease so another worker resumes the job right away
+        await jobs_collection.update_one(
+            {"id": job_id, "owner": WORKER_ID},
+            {"$set": {"leaseUntil": datetime.now()}}
+        )
+        raise
+    except Exception as e:
+        logger.error(f"Job {job_id} ({job['kind']}) failed: {e}")
+        await _finish(job, "failed", str(e))
+    else:
+        await _finish(job, "done")
+        logger.info(f"Job {job_id} ({job['kind']}) done: {job['progress']}")
+
+def start_job(job_id: str):
+    if job_id in _running:
+        return
+    task = asyncio.create_task(run_job(job_id))
+    _running[job_id] = task
+    task.add_done_callback(lambda _: _running.pop(job_id, None))
+
+async def resume_jobs():
+    """Claim and start every unfinished job whose lease has expired"""
+    orphans = await jobs_collection.find(
+        {"status": {"$in": ["pending", "running"]}, "leaseUntil": {"$lte": datetime.now()}},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    for job in orphans:
+        start_job(job["id"])
+    return len(orphans)
+
+async def run_job_sweeper():
+    """Background loop picking up jobs left behind by dead workers"""
+    while True:
+        try:
+            resumed = await resume_jobs()
+            if resumed:
+                logger.info(f"Resumed {resumed} background job(s)")
+        except Exception as e:
+            logger.error(f"Job sweep failed: {e}")
+        await asyncio.sleep(JOB_SWEEP_SECONDS)
+
+def start_job_sweeper() -> asyncio.Task:
+    return asyncio.create_task(run_job_sweeper())
+
+async def stop_jobs():
+    """Cancel jobs running here, releasing their leases for other workers"""
+    for task in list(_running.values()):
+        task.cancel()
+    await asyncio.gather(*_running.values(), return_exceptions=True)
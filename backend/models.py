@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -96,6 +96,68 @@ class Payment(PaymentBase):
     id: str
     paymentDate: datetime = Field(default_factory=datetime.now)
 
+class LedgerEntry(Payment):
+    runningPaidCount: int
+    runningPaid: float
+    pendingAfter: float
+
+class MemberLedger(BaseModel):
+    memberId: str
+    emiAmount: float
+    items: List[LedgerEntry]
+    nextCursor: Optional[str] = None
+    # First page only: the ledger totals against the member's stored counters
+    paymentsCount: Optional[int] = None
+    totalPaid: Optional[float] = None
+    emiPaidCount: Optional[int] = None
+    consistent: Optional[bool] = None
+
+# Group Detail Models
+class GroupDetailMember(Member):
+    paymentsCount: int = 0
+    totalPaid: float = 0
+    lastPaymentDate: Optional[datetime] = None
+
+class GroupDetail(BaseModel):
+    group: Group
+    members: List[GroupDetailMember]
+
+class BulkRowResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+def validation_message(error: ValidationError) -> str:
+    """One-line summary of a row's validation errors, for BulkRowResult.detail"""
+    return "; ".join(f"{'.'.join(str(l) for l in e['loc'])}: {e['msg']}" for e in error.errors())
+
+class PaymentBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+class AuctionBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+class MemberSearchHit(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    name: str
+    phone: str
+    groupId: str
+    status: MemberStatus = MemberStatus.active
+    pendingAmount: float = 0
+    match: str
+
+class MemberImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[BulkRowResult]
+
 # BC Transfer Model
 class BCTransfer(BaseModel):
     memberId: str
@@ -134,6 +196,50 @@ class Auction(AuctionBase):
     srNo: int
     createdAt: datetime = Field(default_factory=datetime.now)
 
+class AuctionRollup(BaseModel):
+    key: Optional[str] = None
+    count: int = 0
+    prized: int = 0
+    previousArrear: float = 0
+    currentAmount: float = 0
+    cumShare: float = 0
+    toBeCollected: float = 0
+    unclaimedAmt: float = 0
+
+class AuctionSummary(BaseModel):
+    totals: AuctionRollup
+    byGroup: List[AuctionRollup]
+    byAgent: List[AuctionRollup]
+    byStatus: List[AuctionRollup]
+    arrearBuckets: List[AuctionRollup]
+    computedAt: Optional[datetime] = None
+
+# Background Job Models
+class Job(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    kind: str
+    status: str
+    params: dict = {}
+    progress: dict = {}
+    error: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    finishedAt: Optional[datetime] = None
+
+# Tally Sheet Models
+class TallyEntry(Member):
+    groupName: str = "Unknown"
+    groupEmi: float = 0
+
+class TallyPage(BaseModel):
+    items: List[TallyEntry]
+    nextCursor: Optional[str] = None
+    total: Optional[int] = None
+    totalPending: Optional[float] = None
+    totalPenalties: Optional[float] = None
+
 # Dashboard Stats
 class DashboardStats(BaseModel):
     totalGroups: int
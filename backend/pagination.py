@@ -0,0 +1,138 @@
+"""
+Keyset pagination helpers for the list endpoints.
+
+Pages are ordered by an indexed sort key plus ``id`` as a tie-breaker. The
+cursor for the next page is the sort key values of the last document,
+returned in the ``X-Next-Cursor`` response header.
+
+Sort keys may be null or missing on some documents (MongoDB sorts those
+first ascending and last descending); otherwise a key's values must
+share one BSON type, as range operators only compare within a type.
+"""
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional, Tuple, Type
+import base64
+import json
+
+from serialization import model_list_response
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+def encode_cursor(doc: dict, sort_keys: List[str]) -> str:
+    """Opaque cursor pointing just past ``doc``"""
+    values = [_encode_value(doc.get(key)) for key in sort_keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor: str, sort_keys: List[str]) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+def _after(key: str, value, direction: int) -> Optional[dict]:
+    """Condition for ``key`` sorting strictly after ``value``; None if nothing can.
+
+    Range operators never match null or missing values, which sort before
+    every other value, so they are added or excluded explicitly.
+    """
+    if value is None:
+        return {key: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {key: {"$gt": value}}
+    return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+def keyset_filter(sort_keys: List[str], values: list, direction: int = 1) -> dict:
+    """Match documents strictly after ``values`` in key order (1 = ascending, -1 = descending)"""
+    clauses = []
+    for i, key in enumerate(sort_keys):
+        after = _after(key, values[i], direction)
+        if after is None:
+            continue
+        # Equality on None also matches a missing key, as the sort treats them alike
+        clause = {k: v for k, v in zip(sort_keys[:i], values[:i])}
+        clause.update(after)
+        clauses.append(clause)
+    # An empty $or is rejected by the server
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+def parse_fields(fields: Optional[str], sort_keys: List[str]) -> Optional[dict]:
+    """Build a projection from a comma-separated ``fields`` parameter"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    projection = {"_id": 0, "id": 1}
+    for name in names + sort_keys:
+        if name.startswith("$") or name == "_id":
+            raise HTTPException(status_code=400, detail=f"Invalid field: {name}")
+        projection[name] = 1
+    return projection
+
+async def paginate(
+    collection,
+    query: dict,
+    sort_keys: List[str],
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page of ``collection``; returns the documents and the next cursor"""
+    projection = parse_fields(fields, sort_keys) or {"_id": 0}
+
+    if after:
+        query = {"$and": [query, keyset_filter(sort_keys, decode_cursor(after, sort_keys))]}
+
+    cursor = collection.find(query, projection)
+    if limit or after:
+        cursor = cursor.sort([(key, 1) for key in sort_keys])
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = await cursor.to_list(limit)
+
+    next_cursor = None
+    if limit and len(docs) == limit:
+        next_cursor = encode_cursor(docs[-1], sort_keys)
+    return docs, next_cursor
+
+def page_response(
+    docs: List[dict],
+    next_cursor: Optional[str],
+    fields: Optional[str],
+    response: Response,
+    model: Optional[Type[BaseModel]] = None
+):
+    """Attach the next cursor and return the page.
+
+    Projected pages are partial documents, so they are returned as plain
+    JSON instead of going through the route's response model. Passing
+    ``model`` opts full pages into the fast serialization path.
+    """
+    if fields or model:
+        if fields:
+            response = JSONResponse(jsonable_encoder(docs))
+        else:
+            response = model_list_response(model, docs)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return response
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return docs
@@ -0,0 +1,106 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from datetime import datetime
+from typing import Optional
+
+from models import DashboardStats
+from database import groups_collection, members_collection, payments_collection, auctions_collection
+from stats import rebuild_stats, get_stats
+from utils import check_groups, request_recalc
+from cache import group_cache
+from instrumentation import render_metrics
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Hot-path queries checked by /admin/explain: (name, collection, filter, sort)
+HOT_QUERIES = [
+    ("group by id", groups_collection, {"id": ""}, None),
+    ("groups page", groups_collection, {}, [("createdAt", 1), ("id", 1)]),
+    ("member by id", members_collection, {"id": ""}, None),
+    ("members of group", members_collection, {"groupId": ""}, None),
+    ("active members of group", members_collection, {"groupId": "", "status": "active"}, None),
+    ("members page", members_collection, {}, [("createdAt", 1), ("id", 1)]),
+    ("payment by id", payments_collection, {"id": ""}, None),
+    ("payments of member", payments_collection, {"memberId": ""}, None),
+    ("payments page", payments_collection, {}, [("paymentDate", 1), ("id", 1)]),
+    ("payments in date range", payments_collection, {"paymentDate": {"$gte": datetime(2000, 1, 1)}}, [("paymentDate", 1), ("id", 1)]),
+    ("members joined in range", members_collection, {"joinDate": {"$gte": datetime(2000, 1, 1)}}, None),
+    ("auction by id", auctions_collection, {"id": ""}, None),
+    ("latest auction srNo", auctions_collection, {}, [("srNo", -1)]),
+    ("auctions of group page", auctions_collection, {"groupNo": ""}, [("srNo", 1), ("id", 1)]),
+]
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten the stage names of a query plan tree"""
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage")]:
+        if child:
+            stages.extend(_plan_stages(child))
+    return [s for s in stages if s]
+
+@router.post("/stats/rebuild", response_model=DashboardStats)
+async def rebuild_dashboard_stats():
+    """Recompute the materialized dashboard counters from scratch"""
+    await rebuild_stats()
+    return await get_stats()
+
+async def _inconsistent_groups(group_id: Optional[str]) -> tuple:
+    report = await check_groups(groups_collection, members_collection, [group_id] if group_id else None)
+    return len(report), [r for r in report if not r["consistent"]]
+
+@router.get("/groups/consistency")
+async def check_group_consistency(groupId: Optional[str] = None):
+    """Verify stored group counts/EMI/vacancies against the members collection"""
+    checked, inconsistent = await _inconsistent_groups(groupId)
+    return {
+        "checked": checked,
+        "inconsistent": inconsistent
+    }
+
+@router.post("/groups/consistency/fix")
+async def fix_group_consistency(groupId: Optional[str] = None):
+    """Recalculate every group whose stored counts/EMI/vacancies have drifted"""
+    checked, inconsistent = await _inconsistent_groups(groupId)
+    for entry in inconsistent:
+        await request_recalc(entry["groupId"], groups_collection, members_collection)
+    return {
+        "checked": checked,
+        "inconsistent": inconsistent,
+        "fixed": [entry["groupId"] for entry in inconsistent]
+    }
+
+@router.get("/cache")
+async def cache_stats():
+    """Hit/miss counters for the in-process group cache of the worker that serves this request"""
+    return {"groups": group_cache.stats()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request and MongoDB metrics of the worker that serves this request, in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/explain")
+async def explain_hot_queries():
+    """Explain each hot-path query and flag collection scans"""
+    report = []
+    for name, collection, query, sort in HOT_QUERIES:
+        cursor = collection.find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers nest the classic plan under queryPlan
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+        stages = _plan_stages(winning_plan)
+        report.append({
+            "query": name,
+            "collection": collection.name,
+            "filter": query,
+            "sort": sort,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return {
+        "collscans": [r["query"] for r in report if r["collscan"]],
+        "queries": report
+    }
@@ -1,18 +1,119 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
-from models import Auction, AuctionCreate
-from database import auctions_collection
+from models import Auction, AuctionCreate, AuctionBulkResult, BulkRowResult, AuctionSummary
+from database import auctions_collection, auctions_read_collection, stats_collection
+from pagination import paginate, page_response, MAX_PAGE_SIZE
+from sequences import reserve, seed_auction_srno, AUCTION_SRNO
 
 router = APIRouter(prefix="/auctions", tags=["auctions"])
 
+# Keyset order for paginated listing
+SORT_KEYS = ["srNo", "id"]
+
+MAX_BULK_AUCTIONS = 5000
+
+# Ledger amounts summed by /summary
+AMOUNT_FIELDS = ["previousArrear", "currentAmount", "cumShare", "toBeCollected", "unclaimedAmt"]
+# previousArrear bucket lower bounds; the last bucket is open-ended
+ARREAR_BOUNDARIES = [0, 1, 5000, 25000, 100000]
+# Negative or non-numeric arrears
+ARREAR_OTHER = "other"
+SUMMARY_ROLLUP_ID = "auctionSummary"
+
+def _rollup_group(key) -> dict:
+    """$group stage body summing the ledger amounts per ``key``"""
+    stage = {
+        "_id": key,
+        "count": {"$sum": 1},
+        "prized": {"$sum": {"$cond": [{"$eq": ["$status", "Prized"]}, 1, 0]}}
+    }
+    stage.update({field: {"$sum": f"${field}"} for field in AMOUNT_FIELDS})
+    return stage
+
+def _keyed(key_field: str) -> list:
+    return [{"$group": _rollup_group(f"${key_field}")}, {"$sort": {"_id": 1}}]
+
+def _arrear_label(lower) -> str:
+    if lower == ARREAR_OTHER:
+        return lower
+    if lower == ARREAR_BOUNDARIES[-1]:
+        return f"{lower}+"
+    upper = ARREAR_BOUNDARIES[ARREAR_BOUNDARIES.index(lower) + 1]
+    return f"{lower}-{upper}"
+
+async def _compute_summary(query: dict) -> dict:
+    bucket_output = {k: v for k, v in _rollup_group(None).items() if k != "_id"}
+    pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "totals": [{"$group": _rollup_group(None)}],
+            "byGroup": _keyed("groupNo"),
+            "byAgent": _keyed("agentCode"),
+            "byStatus": _keyed("status"),
+            "arrearBuckets": [{"$bucket": {
+                "groupBy": "$previousArrear",
+                "boundaries": ARREAR_BOUNDARIES + [float("inf")],
+                "default": ARREAR_OTHER,
+                "output": bucket_output
+            }}]
+        }}
+    ]
+    result = (await auctions_read_collection.aggregate(pipeline).to_list(1))[0]
+    result["totals"] = result["totals"][0] if result["totals"] else {}
+    result["totals"].pop("_id", None)
+    for facet in ("byGroup", "byAgent", "byStatus"):
+        for row in result[facet]:
+            row["key"] = row.pop("_id")
+    for bucket in result["arrearBuckets"]:
+        bucket["key"] = _arrear_label(bucket.pop("_id"))
+    result["computedAt"] = datetime.now()
+    return result
+
 @router.get("/", response_model=List[Auction])
-async def get_auctions():
-    """Get all auction records"""
-    auctions = await auctions_collection.find({}, {"_id": 0}).to_list(None)
-    return auctions
+async def get_auctions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    groupNo: Optional[str] = None
+):
+    """Get all auction records, optionally of one group and one page at a time"""
+    # A group's pages are served by the groupNo_srNo_id index
+    query = {"groupNo": groupNo} if groupNo else {}
+    auctions, next_cursor = await paginate(auctions_read_collection, query, SORT_KEYS, limit, after, fields)
+    return page_response(auctions, next_cursor, fields, response)
+
+@router.get("/summary", response_model=AuctionSummary)
+async def get_auction_summary(
+    groupNo: Optional[str] = None,
+    agentCode: Optional[str] = None,
+    rollup: bool = False,
+    maxAge: int = Query(300, ge=0)
+):
+    """Sums, counts and arrear buckets by group, agent and status.
+
+    ``rollup=true`` serves the unfiltered summary from a stored copy that is
+    recomputed once it is older than ``maxAge`` seconds.
+    """
+    query = {}
+    if groupNo:
+        query["groupNo"] = groupNo
+    if agentCode:
+        query["agentCode"] = agentCode
+    
+    if not rollup or query:
+        return await _compute_summary(query)
+    
+    stored = await stats_collection.find_one({"_id": SUMMARY_ROLLUP_ID}, {"_id": 0})
+    if stored and (datetime.now() - stored["computedAt"]).total_seconds() <= maxAge:
+        return stored
+    summary = await _compute_summary({})
+    await stats_collection.replace_one({"_id": SUMMARY_ROLLUP_ID}, summary, upsert=True)
+    return summary
 
 @router.get("/{auction_id}", response_model=Auction)
 async def get_auction(auction_id: str):
@@ -27,18 +128,58 @@ async def create_auction(auction_data: AuctionCreate):
     """Create new auction record"""
     auction_dict = auction_data.model_dump()
     auction_dict["id"] = str(uuid.uuid4())
+    auction_dict["createdAt"] = datetime.now()
     
-    # Get current max srNo and increment
-    max_auction = await auctions_collection.find_one(
-        {},
-        sort=[("srNo", -1)]
-    )
-    auction_dict["srNo"] = (max_auction.get("srNo", 0) + 1) if max_auction else 1
-    auction_dict["createdAt"] = datetime.now().isoformat()
+    # srNo comes from the counter; the unique index rejects a number that
+    # was taken behind its back (e.g. a manual insert), so reseed and retry
+    for attempt in range(3):
+        auction_dict["srNo"] = await reserve(AUCTION_SRNO)
+        try:
+            await auctions_collection.insert_one(auction_dict)
+            break
+        except DuplicateKeyError:
+            auction_dict.pop("_id", None)
+            await seed_auction_srno()
+    else:
+        raise HTTPException(status_code=409, detail="Could not allocate a serial number")
     
-    await auctions_collection.insert_one(auction_dict)
     return Auction(**auction_dict)
 
+@router.post("/bulk", response_model=AuctionBulkResult)
+async def create_auctions_bulk(auctions_data: List[AuctionCreate]):
+    """Record many auctions with one reserved block of serial numbers"""
+    if len(auctions_data) > MAX_BULK_AUCTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_AUCTIONS} auctions per request")
+    if not auctions_data:
+        return AuctionBulkResult(created=0, failed=0, results=[])
+    
+    first_srno = await reserve(AUCTION_SRNO, len(auctions_data))
+    now = datetime.now()
+    docs = []
+    results = []
+    for index, auction_data in enumerate(auctions_data):
+        auction_dict = auction_data.model_dump()
+        auction_dict["id"] = str(uuid.uuid4())
+        auction_dict["srNo"] = first_srno + index
+        auction_dict["createdAt"] = now
+        docs.append(auction_dict)
+        results.append(BulkRowResult(index=index, status="created", id=auction_dict["id"]))
+    
+    try:
+        await auctions_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            results[error["index"]] = BulkRowResult(
+                index=error["index"],
+                status="error",
+                detail=error.get("errmsg", "Insert failed")
+            )
+        # Collisions mean the counter fell behind the collection
+        await seed_auction_srno()
+    
+    created = sum(1 for r in results if r.status == "created")
+    return AuctionBulkResult(created=created, failed=len(results) - created, results=results)
+
 @router.put("/{auction_id}", response_model=Auction)
 async def update_auction(auction_id: str, auction_data: AuctionCreate):
     """Update auction record"""
@@ -1,19 +1,38 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
+import asyncio
 import uuid
 from datetime import datetime
 
-from models import Group, GroupCreate, GroupUpdate
-from database import groups_collection, members_collection
-from utils import recalc_group
+from models import Group, GroupCreate, GroupUpdate, GroupDetail
+from database import groups_collection, members_collection, payments_collection
+from utils import request_recalc
+from stats import record_group_created
+from pagination import paginate, page_response, MAX_PAGE_SIZE
+from cache import invalidate_group
+from jobs import create_job, cancel_job, start_job
+from conditional import bump_version, make_etag, etag_matches, not_modified, with_cache_headers, LIST_CACHE_CONTROL
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
+# Keyset order for paginated listing
+SORT_KEYS = ["createdAt", "id"]
+
 @router.get("/", response_model=List[Group])
-async def get_groups():
-    """Get all groups"""
-    groups = await groups_collection.find({}, {"_id": 0}).to_list(None)
-    return groups
+async def get_groups(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get all groups, optionally one page at a time"""
+    etag = await make_etag("groups")
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+    
+    groups, next_cursor = await paginate(groups_collection, {}, SORT_KEYS, limit, after, fields)
+    return with_cache_headers(page_response(groups, next_cursor, fields, response), response, etag, LIST_CACHE_CONTROL)
 
 @router.get("/{group_id}", response_model=Group)
 async def get_group(group_id: str):
@@ -23,6 +42,43 @@ async def get_group(group_id: str):
         raise HTTPException(status_code=404, detail="Group not found")
     return group
 
+@router.get("/{group_id}/detail", response_model=GroupDetail)
+async def get_group_detail(group_id: str, request: Request, response: Response):
+    """Group, its members and each member's payment summary in one response"""
+    # Payment writes bump the members version, so these two cover everything
+    # returned; the group id keeps one group's tag from validating another's
+    group, etag = await asyncio.gather(
+        groups_collection.find_one({"id": group_id}, {"_id": 0}),
+        make_etag("members", group_id, depends=["groups"])
+    )
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+    
+    members = await members_collection.find({"groupId": group_id}, {"_id": 0}).to_list(None)
+    # By member rather than by the payments' own groupId, which older
+    # payments may have recorded wrongly; served by memberId_paymentDate_id
+    summaries = await payments_collection.aggregate([
+        {"$match": {"memberId": {"$in": [member["id"] for member in members]}}},
+        {
+            "$group": {
+                "_id": "$memberId",
+                "paymentsCount": {"$sum": 1},
+                "totalPaid": {"$sum": "$amount"},
+                "lastPaymentDate": {"$max": "$paymentDate"}
+            }
+        }
+    ]).to_list(None)
+    
+    by_member = {summary.pop("_id"): summary for summary in summaries}
+    for member in members:
+        member.update(by_member.get(member["id"], {}))
+    
+    # Rendered straight to JSON bytes, as for the member lists
+    detail = Response(GroupDetail(group=group, members=members).model_dump_json(), media_type="application/json")
+    return with_cache_headers(detail, response, etag, LIST_CACHE_CONTROL)
+
 @router.post("/", response_model=Group)
 async def create_group(group_data: GroupCreate):
     """Create new group"""
@@ -31,9 +87,11 @@ async def create_group(group_data: GroupCreate):
     group_dict["emiAmount"] = 0
     group_dict["membersCount"] = 0
     group_dict["vacancies"] = group_data.maxMembers
-    group_dict["createdAt"] = datetime.now().isoformat()
+    group_dict["createdAt"] = datetime.now()
     
     await groups_collection.insert_one(group_dict)
+    await bump_version("groups")
+    await record_group_created()
     return Group(**group_dict)
 
 @router.put("/{group_id}", response_model=Group)
@@ -48,37 +106,35 @@ async def update_group(group_id: str, group_data: GroupUpdate):
         {"id": group_id},
         {"$set": update_dict}
     )
+    invalidate_group(group_id)
+    await bump_version("groups")
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Group not found")
     
     # Recalculate if totalChitAmount changed
     if "totalChitAmount" in update_dict:
-        await recalc_group(group_id, groups_collection, members_collection)
+        await request_recalc(group_id, groups_collection, members_collection)
     
     group = await groups_collection.find_one({"id": group_id}, {"_id": 0})
     return Group(**group)
 
-@router.delete("/{group_id}")
+@router.delete("/{group_id}", status_code=202)
 async def delete_group(group_id: str):
-    """Delete group and all its members"""
-    try:
-        # Check if group exists
-        group = await groups_collection.find_one({"id": group_id})
-        if not group:
-            raise HTTPException(status_code=404, detail="Group not found")
-        
-        # Delete the group
-        result = await groups_collection.delete_one({"id": group_id})
-        
-        # Delete all members of this group
-        await members_collection.delete_many({"groupId": group_id})
-        
-        return {"message": "Group deleted successfully", "deleted": True}
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error deleting group: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Failed to delete group: {str(e)}")
+    """Delete group; its members and payments are removed by a background job"""
+    group = await groups_collection.find_one({"id": group_id}, {"_id": 0})
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    # Mark the group so a repeated request cannot start a second cascade
+    job = await create_job("delete-group", {"group": group})
+    claimed = await groups_collection.update_one(
+        {"id": group_id, "deletingJob": {"$exists": False}},
+        {"$set": {"deletingJob": job["id"]}}
+    )
+    if claimed.matched_count == 0:
+        await cancel_job(job, "Group is already being deleted")
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    start_job(job["id"])
+    return {"message": "Group deletion started", "status": "pending", "jobId": job["id"]}
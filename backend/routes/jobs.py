@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+
+from models import Job
+from database import jobs_collection
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Get status and progress of a background job"""
+    job = await jobs_collection.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,25 +1,109 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import List, Optional
 import uuid
+import csv
+import io
+import re
 from datetime import datetime
 
-from models import Member, MemberCreate, MemberUpdate, BCTransfer, PendingEdit
-from database import members_collection, groups_collection
-from utils import calculate_pending, recalc_group
+from models import Member, MemberCreate, MemberUpdate, BCTransfer, PendingEdit, MemberImportResult, BulkRowResult, MemberSearchHit, MemberLedger, validation_message
+from database import members_collection, members_read_collection, groups_collection, payments_collection
+from utils import calculate_pending, request_recalc, restate_with_emi, search_fields, name_prefix_query, normalize_name, phone_digits, to_datetime
+from stats import record_member_change, bump, merge_deltas, member_deltas
+from pagination import paginate, page_response, encode_cursor, decode_cursor, keyset_filter, MAX_PAGE_SIZE
+from export import stream_export, date_range_query, EXPORT_FORMATS
+from cache import get_group, get_group_entry
+from serialization import model_list_response
+from conditional import bump_version, make_etag, etag_matches, not_modified, with_cache_headers, LIST_CACHE_CONTROL
 
 router = APIRouter(prefix="/members", tags=["members"])
 
+# Keyset order for paginated listing
+SORT_KEYS = ["createdAt", "id"]
+
+# Ledger order is the order payments were made, served by the memberId_paymentDate_id index
+LEDGER_SORT_KEYS = ["paymentDate", "id"]
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_SEARCH_RESULTS = 100
+
+# Search match kinds, best first
+SEARCH_RANKS = ["exact", "prefix", "word", "phone", "phone-suffix"]
+SEARCH_PROJECTION = {"_id": 0, "id": 1, "name": 1, "phone": 1, "groupId": 1, "status": 1, "pendingAmount": 1, "nameLower": 1, "phoneDigits": 1}
+
 @router.get("/", response_model=List[Member])
-async def get_members():
-    """Get all members"""
-    members = await members_collection.find({}, {"_id": 0}).to_list(None)
-    return members
+async def get_members(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get all members, optionally one page at a time"""
+    members, next_cursor = await paginate(members_read_collection, {}, SORT_KEYS, limit, after, fields)
+    return page_response(members, next_cursor, fields, response, Member)
+
+@router.get("/export")
+async def export_members(
+    fmt: str = Query("ndjson", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    groupId: Optional[str] = None,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to")
+):
+    """Stream members as NDJSON or CSV, optionally by group and join date range"""
+    query = date_range_query("joinDate", from_date, to_date)
+    if groupId:
+        query["groupId"] = groupId
+    return stream_export(members_read_collection, query, list(Member.model_fields), fmt, "members")
+
+@router.get("/search", response_model=List[MemberSearchHit])
+async def search_members(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS)):
+    """Search members by name (prefix, then any word's prefix) or phone (exact, then suffix)"""
+    hits = {}
+    
+    def add(docs, kind):
+        for doc in docs:
+            if doc["id"] not in hits:
+                hits[doc["id"]] = (doc, kind)
+    
+    digits = phone_digits(q)
+    if digits and len(digits) == len(re.sub(r"[\s+\-()]", "", q)):
+        # Exact and suffix phone matches both use index range scans
+        add(await members_read_collection.find({"phoneDigits": digits}, SEARCH_PROJECTION).to_list(limit), "phone")
+        if len(hits) < limit:
+            suffix = {"phoneReversed": {"$regex": f"^{digits[::-1]}"}}
+            add(await members_read_collection.find(suffix, SEARCH_PROJECTION).limit(limit).to_list(limit), "phone-suffix")
+    else:
+        term = normalize_name(q)
+        # Anchored, case-sensitive regexes on the normalized fields are index
+        # range scans; an unanchored one would scan the whole index
+        prefix = await members_read_collection.find(
+            name_prefix_query(q), SEARCH_PROJECTION
+        ).sort("nameLower", 1).limit(limit).to_list(limit)
+        add(prefix, "prefix")
+        if len(hits) < limit and " " not in term:
+            # Surnames and other later words, through the multikey nameWords index
+            words = await members_read_collection.find(
+                {"nameWords": {"$regex": f"^{re.escape(term)}"}, "id": {"$nin": list(hits)}}, SEARCH_PROJECTION
+            ).limit(limit - len(hits)).to_list(limit)
+            add(words, "word")
+        for member_id, (doc, kind) in hits.items():
+            if normalize_name(doc.get("name")) == term:
+                hits[member_id] = (doc, "exact")
+    
+    ranked = sorted(hits.values(), key=lambda hit: (SEARCH_RANKS.index(hit[1]), normalize_name(hit[0].get("name"))))
+    return [MemberSearchHit(**doc, match=kind) for doc, kind in ranked[:limit]]
 
 @router.get("/group/{group_id}", response_model=List[Member])
-async def get_members_by_group(group_id: str):
+async def get_members_by_group(group_id: str, request: Request, response: Response):
     """Get all members of a specific group"""
+    etag = await make_etag("members", group_id, depends=["groups"])
+    if etag_matches(request, etag):
+        return not_modified(etag, LIST_CACHE_CONTROL)
+    
     members = await members_collection.find({"groupId": group_id}, {"_id": 0}).to_list(None)
-    return members
+    return with_cache_headers(model_list_response(Member, members), response, etag, LIST_CACHE_CONTROL)
 
 @router.get("/{member_id}", response_model=Member)
 async def get_member(member_id: str):
@@ -29,33 +113,182 @@ async def get_member(member_id: str):
         raise HTTPException(status_code=404, detail="Member not found")
     return member
 
-@router.post("/", response_model=Member)
-async def create_member(member_data: MemberCreate):
-    """Create new member"""
-    # Check if group exists
-    group = await groups_collection.find_one({"id": member_data.groupId})
-    if not group:
-        raise HTTPException(status_code=400, detail="Invalid group")
+def _ledger_pending(join_date: Optional[datetime], emi_amount: float):
+    """pendingAmount as of each payment: calculate_pending at paymentDate with the running paid count"""
+    if not join_date or not emi_amount:
+        return {"$literal": 0}
+    payment_date = {"$toDate": "$paymentDate"}
+    months = {
+        "$add": [
+            {"$multiply": [{"$subtract": [{"$year": payment_date}, join_date.year]}, 12]},
+            {"$subtract": [{"$month": payment_date}, join_date.month]},
+            1
+        ]
+    }
+    return {"$max": [{"$multiply": [{"$subtract": [months, "$runningPaidCount"]}, emi_amount]}, 0]}
+
+@router.get("/{member_id}/ledger", response_model=MemberLedger)
+async def get_member_ledger(
+    member_id: str,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """A member's payments in the order they were made, with running paid and pending balances"""
+    member = await members_collection.find_one(
+        {"id": member_id},
+        {"_id": 0, "groupId": 1, "joinDate": 1, "emiPaidCount": 1}
+    )
+    if not member:
+        raise HTTPException(status_code=404, detail="Member not found")
     
+    group = await get_group(member["groupId"])
+    emi_amount = group.get("emiAmount", 0) if group else 0
+    window = {"documents": ["unbounded", "current"]}
+    
+    page = []
+    if after:
+        page.append({"$match": keyset_filter(LEDGER_SORT_KEYS, decode_cursor(after, LEDGER_SORT_KEYS))})
+    page += [
+        {"$limit": limit},
+        {"$set": {"pendingAfter": _ledger_pending(to_datetime(member.get("joinDate")), emi_amount)}},
+        {"$project": {"_id": 0}}
+    ]
+    facets = {"items": page}
+    # Ledger totals are only needed with the first page
+    if not after:
+        facets["totals"] = [{"$group": {"_id": None, "count": {"$sum": 1}, "paid": {"$sum": "$amount"}}}]
+    
+    # Running totals span every earlier payment, so they are computed before the page is cut
+    pipeline = [
+        {"$match": {"memberId": member_id}},
+        {"$sort": {key: 1 for key in LEDGER_SORT_KEYS}},
+        {
+            "$setWindowFields": {
+                "sortBy": {key: 1 for key in LEDGER_SORT_KEYS},
+                "output": {
+                    "runningPaidCount": {"$sum": 1, "window": window},
+                    "runningPaid": {"$sum": "$amount", "window": window}
+                }
+            }
+        },
+        {"$facet": facets}
+    ]
+    result = (await payments_collection.aggregate(pipeline).to_list(1))[0]
+    items = result["items"]
+    
+    ledger = MemberLedger(
+        memberId=member_id,
+        emiAmount=emi_amount,
+        items=items,
+        nextCursor=encode_cursor(items[-1], LEDGER_SORT_KEYS) if len(items) == limit else None
+    )
+    if not after:
+        totals = result["totals"][0] if result["totals"] else {"count": 0, "paid": 0}
+        ledger.paymentsCount = totals["count"]
+        ledger.totalPaid = totals["paid"]
+        ledger.emiPaidCount = member.get("emiPaidCount", 0)
+        ledger.consistent = ledger.paymentsCount == ledger.emiPaidCount
+    return ledger
+
+def _new_member_doc(member_data: MemberCreate, emi_amount: float) -> dict:
+    """Build the stored document for a new member"""
     member_dict = member_data.model_dump()
     member_dict["id"] = str(uuid.uuid4())
     member_dict["bcHistory"] = []
     member_dict["emiPaidCount"] = 0
-    member_dict["joinDate"] = member_dict["joinDate"].isoformat() if isinstance(member_dict["joinDate"], datetime) else member_dict["joinDate"]
+    member_dict["joinDate"] = to_datetime(member_dict["joinDate"])
+    member_dict["endDate"] = to_datetime(member_dict.get("endDate"))
     
     # Calculate initial pending amount
-    emi_amount = group.get("emiAmount", 0)
-    join_date = datetime.fromisoformat(member_dict["joinDate"])
-    member_dict["pendingAmount"] = calculate_pending(join_date, emi_amount, 0)
+    member_dict["pendingAmount"] = calculate_pending(member_dict["joinDate"], emi_amount, 0)
     member_dict["manualPendingOverride"] = False
-    member_dict["createdAt"] = datetime.now().isoformat()
-    member_dict["updatedAt"] = datetime.now().isoformat()
+    member_dict["createdAt"] = datetime.now()
+    member_dict["updatedAt"] = member_dict["createdAt"]
+    member_dict.update(search_fields(member_dict["name"], member_dict["phone"]))
+    return member_dict
+
+@router.post("/", response_model=Member)
+async def create_member(member_data: MemberCreate):
+    """Create new member"""
+    # Check if group exists
+    entry = await get_group_entry(member_data.groupId)
+    if not entry.group:
+        raise HTTPException(status_code=400, detail="Invalid group")
+    
+    member_dict = _new_member_doc(member_data, entry.emi_amount)
     
     await members_collection.insert_one(member_dict)
-    await recalc_group(member_data.groupId, groups_collection, members_collection)
+    versions = await record_member_change(None, member_dict, entry.emi_amount, "members")
+    await restate_with_emi(member_dict["id"], member_data.groupId, entry, versions, None, member_dict, members_collection)
+    await request_recalc(member_data.groupId, groups_collection, members_collection)
     
     return Member(**member_dict)
 
+def _read_rows(reader: csv.DictReader, count: int) -> List[tuple]:
+    """Read up to ``count`` (line number, row) pairs from the CSV reader"""
+    rows = []
+    for row in reader:
+        rows.append((reader.line_num, row))
+        if len(rows) >= count:
+            break
+    return rows
+
+@router.post("/import", response_model=MemberImportResult)
+async def import_members(file: UploadFile = File(...)):
+    """Import members from a CSV upload, validating and inserting in chunks"""
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    
+    groups = {}
+    touched_groups = set()
+    errors = []
+    imported = 0
+    
+    while True:
+        # Parse off the event loop; the upload is already spooled to disk
+        rows = await run_in_threadpool(_read_rows, reader, IMPORT_CHUNK_SIZE)
+        if not rows:
+            break
+        
+        parsed = []
+        for line, row in rows:
+            # Blank cells mean "not provided" so optional fields keep their defaults
+            values = {k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()}
+            try:
+                parsed.append((line, MemberCreate(**values)))
+            except ValidationError as e:
+                errors.append(BulkRowResult(index=line, status="error", detail=validation_message(e)))
+        
+        missing = list({m.groupId for _, m in parsed} - set(groups))
+        if missing:
+            async for group in groups_collection.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "emiAmount": 1}):
+                groups[group["id"]] = group
+        
+        docs = []
+        deltas = []
+        for line, member_data in parsed:
+            group = groups.get(member_data.groupId)
+            if not group:
+                errors.append(BulkRowResult(index=line, status="error", detail="Invalid group"))
+                continue
+            member_dict = _new_member_doc(member_data, group.get("emiAmount", 0))
+            docs.append(member_dict)
+            deltas.append(member_deltas(None, member_dict, group.get("emiAmount", 0)))
+            touched_groups.add(member_data.groupId)
+        
+        if docs:
+            await members_collection.insert_many(docs, ordered=False)
+            await bump(merge_deltas(*deltas), "members")
+            imported += len(docs)
+    
+    # Each affected group is recalculated once, after all chunks are in
+    for group_id in touched_groups:
+        await request_recalc(group_id, groups_collection, members_collection)
+    
+    # Within a chunk, parse errors are found before group errors
+    errors.sort(key=lambda error: error.index)
+    return MemberImportResult(imported=imported, failed=len(errors), errors=errors)
+
 @router.put("/{member_id}", response_model=Member)
 async def update_member(member_id: str, member_data: MemberUpdate):
     """Update member basic details"""
@@ -64,19 +297,26 @@ async def update_member(member_id: str, member_data: MemberUpdate):
         raise HTTPException(status_code=404, detail="Member not found")
     
     update_dict = {k: v for k, v in member_data.model_dump().items() if v is not None}
-    update_dict["updatedAt"] = datetime.now().isoformat()
+    update_dict["updatedAt"] = datetime.now()
+    if "name" in update_dict or "phone" in update_dict:
+        update_dict.update(search_fields(
+            update_dict.get("name", member.get("name")),
+            update_dict.get("phone", member.get("phone"))
+        ))
     
     # Recalculate pending if not manually overridden
+    entry = await get_group_entry(member["groupId"])
     if not member.get("manualPendingOverride", False):
-        group = await groups_collection.find_one({"id": member["groupId"]})
-        join_date = datetime.fromisoformat(member["joinDate"])
-        emi_amount = group.get("emiAmount", 0) if group else 0
-        update_dict["pendingAmount"] = calculate_pending(join_date, emi_amount, member.get("emiPaidCount", 0))
+        join_date = to_datetime(member["joinDate"])
+        update_dict["pendingAmount"] = calculate_pending(join_date, entry.emi_amount, member.get("emiPaidCount", 0))
     
     await members_collection.update_one(
         {"id": member_id},
         {"$set": update_dict}
     )
+    after = {**member, **update_dict}
+    versions = await record_member_change(member, after, entry.emi_amount, "members")
+    await restate_with_emi(member_id, member["groupId"], entry, versions, member, after, members_collection)
     
     updated_member = await members_collection.find_one({"id": member_id}, {"_id": 0})
     return Member(**updated_member)
@@ -90,11 +330,14 @@ async def delete_member(member_id: str):
     
     group_id = member["groupId"]
     
+    entry = await get_group_entry(group_id)
     result = await members_collection.delete_one({"id": member_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    await recalc_group(group_id, groups_collection, members_collection)
+    versions = await record_member_change(member, None, entry.emi_amount, "members")
+    await restate_with_emi(member_id, group_id, entry, versions, member, None, members_collection)
+    await request_recalc(group_id, groups_collection, members_collection)
     
     return {"message": "Member deleted successfully"}
 
@@ -109,7 +352,7 @@ async def transfer_bc(transfer_data: BCTransfer):
     bc_history = member.get("bcHistory", [])
     bc_history.append({
         "bcName": member["bcHolder"],
-        "transferredAt": transfer_data.transferDate.isoformat()
+        "transferredAt": to_datetime(transfer_data.transferDate)
     })
     
     await members_collection.update_one(
@@ -118,10 +361,11 @@ async def transfer_bc(transfer_data: BCTransfer):
             "$set": {
                 "bcHolder": transfer_data.newBc,
                 "bcHistory": bc_history,
-                "updatedAt": datetime.now().isoformat()
+                "updatedAt": datetime.now()
             }
         }
     )
+    await bump_version("members")
     
     updated_member = await members_collection.find_one({"id": transfer_data.memberId}, {"_id": 0})
     return Member(**updated_member)
@@ -133,16 +377,20 @@ async def edit_pending(pending_data: PendingEdit):
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
     
+    entry = await get_group_entry(member["groupId"])
     await members_collection.update_one(
         {"id": pending_data.memberId},
         {
             "$set": {
                 "pendingAmount": pending_data.pendingAmount,
                 "manualPendingOverride": True,
-                "updatedAt": datetime.now().isoformat()
+                "updatedAt": datetime.now()
             }
         }
     )
+    after = {**member, "pendingAmount": pending_data.pendingAmount, "manualPendingOverride": True}
+    versions = await record_member_change(member, after, entry.emi_amount, "members")
+    await restate_with_emi(member["id"], member["groupId"], entry, versions, member, after, members_collection)
     
     updated_member = await members_collection.find_one({"id": pending_data.memberId}, {"_id": 0})
     return Member(**updated_member)
@@ -1,100 +1,253 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
+from typing import Any, List, NamedTuple, Optional
 import uuid
 from datetime import datetime
 
-from models import Payment, PaymentCreate
-from database import payments_collection, members_collection, groups_collection
-from utils import calculate_pending
+from models import Payment, PaymentCreate, PaymentBulkResult, BulkRowResult, validation_message
+from database import payments_collection, payments_read_collection, members_collection, groups_collection
+from utils import paid_count_update, apply_paid_delta, restate_with_emi, to_local_datetime
+from stats import bump, merge_deltas, member_deltas, payment_deltas
+from pagination import paginate, page_response, MAX_PAGE_SIZE
+from export import stream_export, date_range_query, EXPORT_FORMATS
+from cache import GroupEntry, get_group_entry
+from serialization import model_list_response
+from conditional import bump_version
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
+MAX_BULK_PAYMENTS = 5000
+
+# Keyset order for paginated listing
+SORT_KEYS = ["paymentDate", "id"]
+
 @router.get("/", response_model=List[Payment])
-async def get_payments():
-    """Get all payments"""
-    payments = await payments_collection.find({}, {"_id": 0}).to_list(None)
-    return payments
+async def get_payments(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to")
+):
+    """Get all payments, optionally in a date range and one page at a time"""
+    # The range and the keyset order are both served by the paymentDate_id index
+    query = date_range_query("paymentDate", from_date, to_date, to_local_datetime)
+    payments, next_cursor = await paginate(payments_read_collection, query, SORT_KEYS, limit, after, fields)
+    return page_response(payments, next_cursor, fields, response, Payment)
+
+@router.get("/export")
+async def export_payments(
+    fmt: str = Query("ndjson", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    groupId: Optional[str] = None,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to")
+):
+    """Stream payments as NDJSON or CSV, optionally by group and date range"""
+    query = date_range_query("paymentDate", from_date, to_date, to_local_datetime)
+    if groupId:
+        query["groupId"] = groupId
+    return stream_export(payments_read_collection, query, list(Payment.model_fields), fmt, "payments")
 
 @router.get("/member/{member_id}", response_model=List[Payment])
 async def get_member_payments(member_id: str):
-    """Get all payments for a member"""
-    payments = await payments_collection.find({"memberId": member_id}, {"_id": 0}).to_list(None)
-    return payments
+    """Get all payments for a member, oldest first"""
+    # Sorted by the memberId_paymentDate_id index, no in-memory sort
+    payments = await payments_read_collection.find({"memberId": member_id}, {"_id": 0}).sort(
+        [("paymentDate", 1), ("id", 1)]
+    ).to_list(None)
+    return model_list_response(Payment, payments)
+
+class PaidMove(NamedTuple):
+    """A paid count move that has been applied but not yet recorded"""
+    member: dict
+    group_id: str
+    paid_delta: int
+    entry: GroupEntry
+
+    @property
+    def after(self) -> dict:
+        return apply_paid_delta(self.member, self.paid_delta, self.entry.emi_amount)
+
+async def _move_paid_count(member_id: str, group_id: str, paid_delta: int, query: Optional[dict] = None) -> Optional[PaidMove]:
+    """Atomically move a member's paid count, re-deriving pending with ``group_id``'s EMI.
+
+    Only matches while the member still belongs to ``group_id``, so the EMI
+    used is always that of the member's own group. The EMI comes from the
+    group cache and is checked by ``_record_paid_move``. Returns None if
+    nothing matched.
+    """
+    entry = await get_group_entry(group_id)
+    member = await members_collection.find_one_and_update(
+        {"id": member_id, "groupId": group_id, **(query or {})},
+        paid_count_update(paid_delta, entry.emi_amount),
+        projection={"_id": 0, "bcHistory": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    return PaidMove(member, group_id, paid_delta, entry) if member else None
+
+async def _record_paid_move(move: Optional[PaidMove], *deltas: dict):
+    """Record a paid count move and any other ``deltas`` in one counters write"""
+    if move is None:
+        await bump(merge_deltas(*deltas))
+        return
+    after = move.after
+    versions = await bump(
+        merge_deltas(member_deltas(move.member, after, move.entry.emi_amount), *deltas),
+        "members"
+    )
+    await restate_with_emi(
+        move.member["id"], move.group_id, move.entry, versions, move.member, after, members_collection
+    )
+
+async def _undo_paid_move(move: PaidMove):
+    """Reverse a move that was never recorded"""
+    await members_collection.update_one(
+        {"id": move.member["id"], "groupId": move.group_id},
+        paid_count_update(-move.paid_delta, move.entry.emi_amount)
+    )
+    await bump_version("members")
 
 @router.post("/", response_model=Payment)
 async def create_payment(payment_data: PaymentCreate):
     """Record new payment"""
     payment_dict = payment_data.model_dump()
     payment_dict["id"] = str(uuid.uuid4())
-    payment_dict["paymentDate"] = datetime.now().isoformat()
-    
-    await payments_collection.insert_one(payment_dict)
-    
-    # Update member's paid count and recalculate pending
-    member = await members_collection.find_one({"id": payment_data.memberId})
-    if member:
-        new_emi_paid = member.get("emiPaidCount", 0) + 1
-        
-        update_data = {
-            "emiPaidCount": new_emi_paid,
-            "updatedAt": datetime.now().isoformat()
-        }
-        
-        # Only recalc pending if not manually overridden
-        if not member.get("manualPendingOverride", False):
-            group = await groups_collection.find_one({"id": member["groupId"]})
-            if group:
-                join_date = datetime.fromisoformat(member["joinDate"])
-                update_data["pendingAmount"] = calculate_pending(
-                    join_date,
-                    group.get("emiAmount", 0),
-                    new_emi_paid
-                )
-        
-        await members_collection.update_one(
-            {"id": payment_data.memberId},
-            {"$set": update_data}
-        )
+    payment_dict["paymentDate"] = datetime.now()
+    
+    # Bump the paid count and re-derive pending in one atomic update, which
+    # also checks the payment's groupId against the member's
+    move = await _move_paid_count(payment_data.memberId, payment_data.groupId, 1)
+    if not move:
+        if await members_collection.count_documents({"id": payment_data.memberId}, limit=1):
+            raise HTTPException(status_code=400, detail="Member does not belong to this group")
+        raise HTTPException(status_code=404, detail="Member not found")
+    
+    try:
+        await payments_collection.insert_one(payment_dict)
+    except BaseException:
+        await _undo_paid_move(move)
+        raise
+    # The member's and the payment's stats and the version bump are one write
+    await _record_paid_move(move, payment_deltas(payment_dict["amount"], payment_dict["paymentDate"]))
     
     return Payment(**payment_dict)
 
+@router.post("/bulk", response_model=PaymentBulkResult)
+async def create_payments_bulk(rows: List[Any]):
+    """Record many payments in a few round trips, reporting results per row"""
+    if len(rows) > MAX_BULK_PAYMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_PAYMENTS} payments per request")
+    
+    # Rows are validated one by one so a bad row fails alone instead of the whole batch
+    results = [None] * len(rows)
+    payments_data = []
+    for index, row in enumerate(rows):
+        try:
+            payments_data.append((index, PaymentCreate.model_validate(row)))
+        except ValidationError as e:
+            results[index] = BulkRowResult(index=index, status="error", detail=validation_message(e))
+    
+    member_ids = list({p.memberId for _, p in payments_data})
+    members = await members_collection.find(
+        {"id": {"$in": member_ids}},
+        {"_id": 0, "bcHistory": 0}
+    ).to_list(None)
+    members_by_id = {m["id"]: m for m in members}
+    
+    group_ids = list({m["groupId"] for m in members})
+    groups = await groups_collection.find(
+        {"id": {"$in": group_ids}},
+        {"_id": 0, "id": 1, "emiAmount": 1}
+    ).to_list(None)
+    groups_by_id = {g["id"]: g for g in groups}
+    
+    docs = []
+    doc_rows = []
+    now = datetime.now()
+    for index, payment_data in payments_data:
+        if payment_data.memberId not in members_by_id:
+            results[index] = BulkRowResult(index=index, status="error", detail="Member not found")
+            continue
+        if payment_data.groupId != members_by_id[payment_data.memberId]["groupId"]:
+            results[index] = BulkRowResult(index=index, status="error", detail="Member does not belong to this group")
+            continue
+        payment_dict = payment_data.model_dump()
+        payment_dict["id"] = str(uuid.uuid4())
+        payment_dict["paymentDate"] = now
+        docs.append(payment_dict)
+        doc_rows.append(index)
+        results[index] = BulkRowResult(index=index, status="created", id=payment_dict["id"])
+    
+    # Rows that failed to insert are reported and excluded from the counters
+    failed_docs = set()
+    if docs:
+        try:
+            await payments_collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_docs.add(error["index"])
+                results[doc_rows[error["index"]]] = BulkRowResult(
+                    index=doc_rows[error["index"]],
+                    status="error",
+                    detail=error.get("errmsg", "Insert failed")
+                )
+    inserted = [doc for i, doc in enumerate(docs) if i not in failed_docs]
+    
+    # One counter update per affected member
+    paid_counts = {}
+    for doc in inserted:
+        paid_counts[doc["memberId"]] = paid_counts.get(doc["memberId"], 0) + 1
+    
+    updates = []
+    deltas = [payment_deltas(doc["amount"], doc["paymentDate"]) for doc in inserted]
+    for member_id, count in paid_counts.items():
+        member = members_by_id[member_id]
+        group = groups_by_id.get(member["groupId"])
+        emi_amount = group.get("emiAmount", 0) if group else None
+        deltas.append(member_deltas(member, apply_paid_delta(member, count, emi_amount), emi_amount))
+        updates.append(UpdateOne({"id": member_id, "groupId": member["groupId"]}, paid_count_update(count, emi_amount)))
+    
+    if updates:
+        await members_collection.bulk_write(updates, ordered=False)
+    await bump(merge_deltas(*deltas), *(["members"] if updates else []))
+    
+    created = sum(1 for r in results if r.status == "created")
+    return PaymentBulkResult(created=created, failed=len(results) - created, results=results)
+
 @router.delete("/{payment_id}")
 async def delete_payment(payment_id: str):
     """Delete payment record"""
-    payment = await payments_collection.find_one({"id": payment_id})
+    payment = await payments_collection.find_one({"id": payment_id}, {"_id": 0})
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     
+    # As in create_payment the paid count moves before the payment itself,
+    # so a reconcile never sees the payment gone and the count unchanged.
+    # Decremented atomically, never below zero.
     member_id = payment["memberId"]
+    group_id = payment["groupId"]
+    move = await _move_paid_count(member_id, group_id, -1, {"emiPaidCount": {"$gt": 0}})
+    if not move:
+        # Payments recorded before groupId was checked may name another group
+        owner = await members_collection.find_one({"id": member_id}, {"_id": 0, "groupId": 1})
+        if owner and owner["groupId"] != group_id:
+            move = await _move_paid_count(member_id, owner["groupId"], -1, {"emiPaidCount": {"$gt": 0}})
     
-    result = await payments_collection.delete_one({"id": payment_id})
-    if result.deleted_count == 0:
+    try:
+        result = await payments_collection.delete_one({"id": payment_id})
+    except BaseException:
+        if move:
+            await _undo_paid_move(move)
+        raise
+    if not result.deleted_count:
+        # A concurrent request deleted it and moved the count itself
+        if move:
+            await _undo_paid_move(move)
         raise HTTPException(status_code=404, detail="Payment not found")
     
-    # Update member's paid count
-    member = await members_collection.find_one({"id": member_id})
-    if member and member.get("emiPaidCount", 0) > 0:
-        new_emi_paid = member.get("emiPaidCount", 0) - 1
-        
-        update_data = {
-            "emiPaidCount": new_emi_paid,
-            "updatedAt": datetime.now().isoformat()
-        }
-        
-        # Recalc pending if not manually overridden
-        if not member.get("manualPendingOverride", False):
-            group = await groups_collection.find_one({"id": member["groupId"]})
-            if group:
-                join_date = datetime.fromisoformat(member["joinDate"])
-                update_data["pendingAmount"] = calculate_pending(
-                    join_date,
-                    group.get("emiAmount", 0),
-                    new_emi_paid
-                )
-        
-        await members_collection.update_one(
-            {"id": member_id},
-            {"$set": update_data}
-        )
+    await _record_paid_move(move, payment_deltas(payment.get("amount", 0), payment.get("paymentDate"), sign=-1))
     
     return {"message": "Payment deleted successfully"}
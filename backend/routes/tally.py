@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from datetime import datetime
+import asyncio
+
+from models import TallyPage
+from database import members_read_collection, groups_collection
+from utils import name_prefix_query
+from pagination import encode_cursor, decode_cursor, keyset_filter, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/tally", tags=["tally"])
+
+SORT_KEYS = ["pendingAmount", "id"]
+
+# Late-payment penalty rates, as charged by calculatePenalty in TallySheet.js
+PRIZED_PENALTY_RATE = 0.06
+UNPRIZED_PENALTY_RATE = 0.03
+
+def penalty_expression(now: datetime) -> dict:
+    """A member's late-payment penalty, the same rule as calculatePenalty in TallySheet.js.
+
+    Members with pending dues who have paid fewer EMIs than calendar months
+    since joining owe a share of their pending amount, rounded half up.
+    """
+    join_date = {"$toDate": "$joinDate"}
+    months_since_join = {
+        "$add": [
+            {"$multiply": [{"$subtract": [now.year, {"$year": join_date}]}, 12]},
+            {"$subtract": [now.month, {"$month": join_date}]}
+        ]
+    }
+    pending = {"$ifNull": ["$pendingAmount", 0]}
+    rate = {"$cond": [{"$eq": ["$isPrized", True]}, PRIZED_PENALTY_RATE, UNPRIZED_PENALTY_RATE]}
+    return {
+        "$cond": [
+            {
+                "$and": [
+                    {"$gt": [pending, 0]},
+                    {"$ne": [{"$ifNull": ["$joinDate", None]}, None]},
+                    {"$gt": [months_since_join, {"$ifNull": ["$emiPaidCount", 0]}]}
+                ]
+            },
+            {"$floor": {"$add": [{"$multiply": [pending, rate]}, 0.5]}},
+            0
+        ]
+    }
+
+@router.get("", response_model=TallyPage)
+@router.get("/", response_model=TallyPage, include_in_schema=False)
+async def get_tally(
+    groupId: Optional[str] = None,
+    name: Optional[str] = None,
+    pendingOnly: bool = False,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    """Members joined with their group's name and EMI, filtered and sorted by pending"""
+    match = {}
+    if groupId:
+        match["groupId"] = groupId
+    if name:
+        match.update(name_prefix_query(name))
+    if pendingOnly:
+        match["pendingAmount"] = {"$gt": 0}
+
+    direction = -1 if order == "desc" else 1
+    page_match = match
+    if after:
+        page_match = {"$and": [match, keyset_filter(SORT_KEYS, decode_cursor(after, SORT_KEYS), direction)]}
+
+    # Sort and limit first so the $lookup only runs for the rows on this page
+    items_pipeline = [
+        {"$match": page_match},
+        {"$sort": {key: direction for key in SORT_KEYS}},
+        {"$limit": limit},
+        {
+            "$lookup": {
+                "from": groups_collection.name,
+                "localField": "groupId",
+                "foreignField": "id",
+                "as": "group"
+            }
+        },
+        {
+            "$set": {
+                "groupName": {"$ifNull": [{"$first": "$group.name"}, "Unknown"]},
+                "groupEmi": {"$ifNull": [{"$first": "$group.emiAmount"}, 0]}
+            }
+        },
+        {"$project": {"_id": 0, "group": 0}}
+    ]
+    totals_pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "pending": {"$sum": "$pendingAmount"},
+                "penalties": {"$sum": penalty_expression(datetime.now())}
+            }
+        }
+    ]
+
+    # Filter totals are only needed with the first page
+    if after:
+        items = await members_read_collection.aggregate(items_pipeline).to_list(limit)
+        totals = None
+    else:
+        items, totals = await asyncio.gather(
+            members_read_collection.aggregate(items_pipeline).to_list(limit),
+            members_read_collection.aggregate(totals_pipeline).to_list(1),
+        )
+        totals = totals[0] if totals else {"total": 0, "pending": 0, "penalties": 0}
+
+    return TallyPage(
+        items=items,
+        nextCursor=encode_cursor(items[-1], SORT_KEYS) if len(items) == limit else None,
+        total=totals["total"] if totals else None,
+        totalPending=totals["pending"] if totals else None,
+        totalPenalties=totals["penalties"] if totals else None
+    )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the API.
+
+Runs server:app under uvicorn with one worker process unless --workers or
+WEB_CONCURRENCY asks for more. Cores visible to the process say nothing
+about a container's CPU quota, and every worker opens its own MongoDB
+pool, so size it to the quota and to MONGO_MAX_POOL_SIZE explicitly.
+uvloop and httptools are used when installed (``pip install uvloop
+httptools``), otherwise asyncio and h11.
+
+Workers are separate interpreters and each runs the app lifespan: pool
+warm-up, index creation and the background tasks. Everything kept in
+process is per worker: the group cache, /api/admin/metrics and
+/api/admin/cache (a request reaches one worker, so they describe only
+that worker) and the coalescing of group recalcs.
+
+On SIGTERM / SIGINT the workers stop accepting connections and give
+in-flight requests up to --graceful-timeout seconds to finish before the
+lifespan shutdown stops background work and closes the pool.
+
+    python run.py                         # PORT (default 8001), one worker
+    python run.py --workers 4 --port 8080
+"""
+import argparse
+import importlib.util
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_MAX_POOL_SIZE = 100
+
+logger = logging.getLogger("run")
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY, else 1"""
+    return int(os.environ.get("WEB_CONCURRENCY") or 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Chit Fund API with multiple workers")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--loop", choices=["uvloop", "asyncio"], default="uvloop" if _available("uvloop") else "asyncio")
+    parser.add_argument("--http", choices=["httptools", "h11"], default="httptools" if _available("httptools") else "h11")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("GRACEFUL_TIMEOUT", "30")),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--log-level", default=os.environ.get("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE") or DEFAULT_MAX_POOL_SIZE)
+    logger.info(
+        f"Starting {args.workers} worker(s) on {args.host}:{args.port} with {args.loop}/{args.http}; "
+        f"up to {args.workers * pool_size} MongoDB connections per server (MONGO_MAX_POOL_SIZE={pool_size})"
+    )
+
+    # An import string, so each worker process loads its own app
+    uvicorn.run(
+        "server:app",
+        app_dir=str(ROOT_DIR),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        lifespan="on",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level.lower(),
+    )
+
+if __name__ == "__main__":
+    main()
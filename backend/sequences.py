@@ -0,0 +1,33 @@
+"""
+Atomic sequence allocation backed by the ``counters`` collection.
+
+Each sequence is one document holding the last number handed out.
+``reserve`` bumps it with a single ``find_one_and_update($inc)`` so
+concurrent callers never see the same number, and can claim a whole
+block at once for bulk inserts. Numbers of failed inserts are not
+reused; gaps are expected.
+"""
+from pymongo import ReturnDocument
+
+from database import counters_collection, auctions_collection
+
+AUCTION_SRNO = "auctionSrNo"
+
+async def reserve(name: str, count: int = 1) -> int:
+    """Claim ``count`` consecutive numbers; returns the first"""
+    doc = await counters_collection.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["seq"] - count + 1
+
+async def seed(name: str, value: int):
+    """Raise a sequence to at least ``value``; safe to run concurrently"""
+    await counters_collection.update_one({"_id": name}, {"$max": {"seq": value}}, upsert=True)
+
+async def seed_auction_srno():
+    """Start the srNo sequence past the highest existing auction (srNo index)"""
+    latest = await auctions_collection.find_one({}, {"_id": 0, "srNo": 1}, sort=[("srNo", -1)])
+    await seed(AUCTION_SRNO, latest.get("srNo", 0) if latest else 0)
@@ -1,19 +1,65 @@
 from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from pymongo.errors import PyMongoError
+import asyncio
 import os
 import logging
 from pathlib import Path
 
 # Import routes
-from routes import groups, members, payments, auctions, dashboard
-from database import close_db
+from routes import groups, members, payments, auctions, dashboard, tally, admin, jobs
+from database import close_db, ensure_indexes, warm_pool
+from pagination import NEXT_CURSOR_HEADER
+from batch import start_nightly_pending, start_backfills
+from utils import flush_recalcs
+from cache import start_group_watch
+from sequences import seed_auction_srno
+from jobs import start_job_sweeper, stop_jobs
+from instrumentation import TimingMiddleware
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup and shutdown.
+
+    The server stops accepting connections and lets in-flight requests
+    finish before the shutdown half runs, which then stops background
+    work, flushes pending recalculations and closes the pool.
+    """
+    warmed = await warm_pool()
+    logger.info(f"Database connection pool warmed ({warmed})")
+    await ensure_indexes()
+    logger.info("Database indexes ensured")
+    try:
+        await seed_auction_srno()
+    except PyMongoError as e:
+        # The sequence persists, so only a first start depends on this succeeding
+        logger.error(f"Failed to seed the auction srNo sequence: {e}")
+    tasks = [task for task in (start_nightly_pending(), start_group_watch(), start_job_sweeper(), start_backfills()) if task]
+    
+    yield
+    
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await stop_jobs()
+    await flush_recalcs()
+    await close_db()
+    logger.info("Database connection closed")
+
 # Create the main app without a prefix
-app = FastAPI(title="Chit Fund BC Management System", version="1.0.0")
+app = FastAPI(title="Chit Fund BC Management System", version="1.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -33,6 +79,9 @@ api_router.include_router(members.router)
 api_router.include_router(payments.router)
 api_router.include_router(auctions.router)
 api_router.include_router(dashboard.router)
+api_router.include_router(tally.router)
+api_router.include_router(admin.router)
+api_router.include_router(jobs.router)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -44,16 +93,8 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_db()
-    logger.info("Database connection closed")
\ No newline at end of file
+# Outermost, so timings include the other middleware
+app.add_middleware(TimingMiddleware)
@@ -0,0 +1,321 @@
+"""
+Materialized dashboard counters.
+
+The counters are kept in sync with ``$inc`` from the write paths so
+``/api/dashboard/stats`` is one ``find_one``. They live under
+``dashboard`` in the versions document of conditional.py, so ``bump``
+records a write's deltas and bumps its collection versions in a single
+update. The rolling monthly collection is stored as per-day buckets under
+``daily.<YYYY-MM-DD>`` which are dropped once they fall out of the window.
+``rebuild_stats`` recomputes everything from the source collections to
+fix drift.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+
+from models import DashboardStats
+from database import groups_collection, members_collection, payments_collection, counters_collection
+from conditional import bump_version, VERSIONS_ID
+
+DASHBOARD = "dashboard"
+MONTHLY_WINDOW_DAYS = 30
+
+def _day_key(value) -> Optional[str]:
+    """Bucket key (YYYY-MM-DD) for a payment date"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    return None
+
+def _window_start() -> datetime:
+    """Midnight at the start of the monthly window"""
+    start = datetime.now() - timedelta(days=MONTHLY_WINDOW_DAYS)
+    return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def member_contribution(member: Optional[dict], emi_amount: Optional[float]) -> dict:
+    """What a single member adds to the dashboard counters.
+
+    ``emi_amount`` is None when the member's group does not exist, in which
+    case the member never counts as overdue.
+    """
+    if not member:
+        return {}
+    pending = member.get("pendingAmount", 0) or 0
+    overdue = emi_amount is not None and pending > emi_amount * 2
+    return {
+        "totalMembers": 1,
+        "activeMembers": 1 if member.get("status") == "active" else 0,
+        "totalPending": pending,
+        "overduePending": pending if overdue else 0
+    }
+
+async def bump(deltas: dict, *versions: str) -> dict:
+    """Apply counter deltas and bump the ``versions`` of the changed collections in one write.
+
+    Returns the versions after the write. Counters bumped before the first
+    ``rebuild_stats`` are partial; the rebuild replaces them.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    names = [*versions, "stats"] if deltas else list(versions)
+    if not names:
+        return {}
+    return await bump_version(*names, inc={f"{DASHBOARD}.{k}": v for k, v in deltas.items()})
+
+def merge_deltas(*deltas: dict) -> dict:
+    """Sum several delta dicts so a batch is applied with one $inc"""
+    merged = {}
+    for delta in deltas:
+        for key, value in delta.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+def member_deltas(before: Optional[dict], after: Optional[dict], emi_amount: Optional[float]) -> dict:
+    old = member_contribution(before, emi_amount)
+    new = member_contribution(after, emi_amount)
+    return {k: new.get(k, 0) - old.get(k, 0) for k in set(old) | set(new)}
+
+def payment_deltas(amount: float, payment_date, sign: int = 1) -> dict:
+    amount = (amount or 0) * sign
+    deltas = {"totalCollection": amount}
+    day = _day_key(payment_date)
+    if day and day >= _day_key(_window_start()):
+        deltas[f"daily.{day}"] = amount
+    return deltas
+
+async def record_member_change(before: Optional[dict], after: Optional[dict], emi_amount: Optional[float], *versions: str) -> dict:
+    """Record a member insert (before=None), update, or delete (after=None)"""
+    return await bump(member_deltas(before, after, emi_amount), *versions)
+
+async def correct_member_change(
+    before: Optional[dict],
+    recorded: Optional[dict],
+    recorded_emi: Optional[float],
+    corrected: Optional[dict],
+    emi_amount: Optional[float],
+    *versions: str
+) -> dict:
+    """Replace a recorded change (before -> recorded, under ``recorded_emi``) with before -> corrected"""
+    return await bump(
+        merge_deltas(member_deltas(recorded, before, recorded_emi), member_deltas(before, corrected, emi_amount)),
+        *versions
+    )
+
+async def record_payment(amount: float, payment_date, sign: int = 1):
+    """Record a payment being added (sign=1) or removed (sign=-1)"""
+    await bump(payment_deltas(amount, payment_date, sign))
+
+async def record_group_created():
+    await bump({"totalGroups": 1})
+
+async def record_group_deleted(group: dict):
+    """Remove a group; its members and payments are recorded as the cascade job deletes them"""
+    await bump({
+        "totalGroups": -1,
+        "activeGroups": -1 if group.get("membersCount", 0) > 0 else 0
+    })
+
+async def record_group_recalc(group: dict, members_count: int, emi_amount: float):
+    """Record a group's member count / EMI changing.
+
+    A new EMI moves the overdue threshold for every member of the group,
+    so the overdue delta is summed over the group in one aggregation.
+    """
+    was_active = group.get("membersCount", 0) > 0
+    deltas = {"activeGroups": int(members_count > 0) - int(was_active)}
+
+    old_emi = group.get("emiAmount", 0)
+    if old_emi != emi_amount:
+        pending = {"$ifNull": ["$pendingAmount", 0]}
+        pipeline = [
+            {"$match": {"groupId": group["id"]}},
+            {
+                "$group": {
+                    "_id": None,
+                    "old": {"$sum": {"$cond": [{"$gt": [pending, old_emi * 2]}, pending, 0]}},
+                    "new": {"$sum": {"$cond": [{"$gt": [pending, emi_amount * 2]}, pending, 0]}}
+                }
+            }
+        ]
+        rows = await members_collection.aggregate(pipeline).to_list(1)
+        if rows:
+            deltas["overduePending"] = rows[0]["new"] - rows[0]["old"]
+
+    await bump(deltas)
+
+async def aggregate_dashboard_stats() -> DashboardStats:
+    """Compute dashboard statistics from scratch with aggregation pipelines"""
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+
+    groups_pipeline = [
+        {
+            "$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [{"$gt": [{"$ifNull": ["$membersCount", 0]}, 0]}, 1, 0]}}
+            }
+        }
+    ]
+
+    # Counts and the overdue join run in a single round trip via $facet
+    members_pipeline = [
+        {
+            "$facet": {
+                "counts": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total": {"$sum": 1},
+                            "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+                            "pending": {"$sum": "$pendingAmount"}
+                        }
+                    }
+                ],
+                # Overdue = more than 2 EMIs pending; members without a group are skipped
+                "overdue": [
+                    {"$project": {"_id": 0, "groupId": 1, "pendingAmount": 1}},
+                    {
+                        "$lookup": {
+                            "from": groups_collection.name,
+                            "localField": "groupId",
+                            "foreignField": "id",
+                            "as": "group"
+                        }
+                    },
+                    {"$unwind": "$group"},
+                    {
+                        "$match": {
+                            "$expr": {
+                                "$gt": [
+                                    {"$ifNull": ["$pendingAmount", 0]},
+                                    {"$multiply": [{"$ifNull": ["$group.emiAmount", 0]}, 2]}
+                                ]
+                            }
+                        }
+                    },
+                    {"$group": {"_id": None, "amount": {"$sum": "$pendingAmount"}}}
+                ]
+            }
+        }
+    ]
+
+    # Monthly collection (last 30 days)
+    payments_pipeline = [
+        {
+            "$group": {
+                "_id": None,
+                "total": {"$sum": "$amount"},
+                "monthly": {
+                    "$sum": {
+                        "$cond": [
+                            {"$gt": ["$paymentDate", thirty_days_ago]},
+                            "$amount",
+                            0
+                        ]
+                    }
+                }
+            }
+        }
+    ]
+
+    group_rows, member_rows, payment_rows = await asyncio.gather(
+        groups_collection.aggregate(groups_pipeline).to_list(1),
+        members_collection.aggregate(members_pipeline).to_list(1),
+        payments_collection.aggregate(payments_pipeline).to_list(1),
+    )
+
+    group_stats = group_rows[0] if group_rows else {}
+    member_facets = member_rows[0] if member_rows else {}
+    member_stats = member_facets.get("counts") or [{}]
+    member_stats = member_stats[0]
+    overdue_stats = member_facets.get("overdue") or [{}]
+    overdue_stats = overdue_stats[0]
+    payment_stats = payment_rows[0] if payment_rows else {}
+
+    total_groups = group_stats.get("total", 0)
+    active_groups = group_stats.get("active", 0)
+    total_members = member_stats.get("total", 0)
+    active_members = member_stats.get("active", 0)
+
+    return DashboardStats(
+        totalGroups=total_groups,
+        activeGroups=active_groups,
+        closedGroups=total_groups - active_groups,
+        totalMembers=total_members,
+        activeMembers=active_members,
+        inactiveMembers=total_members - active_members,
+        totalCollection=payment_stats.get("total", 0),
+        monthlyCollection=payment_stats.get("monthly", 0),
+        totalPending=member_stats.get("pending", 0),
+        overduePending=overdue_stats.get("amount", 0)
+    )
+
+async def rebuild_stats(new_version: bool = True) -> dict:
+    """Recompute the stats document from the source collections.
+
+    ``new_version`` bumps the stats version so cached copies are refetched;
+    the first build has nothing cached to invalidate.
+    """
+    daily_pipeline = [
+        {"$match": {"paymentDate": {"$gte": _window_start()}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$paymentDate"}},
+            "amount": {"$sum": "$amount"}
+        }}
+    ]
+    stats, daily_rows = await asyncio.gather(
+        aggregate_dashboard_stats(),
+        payments_collection.aggregate(daily_pipeline).to_list(None),
+    )
+
+    doc = {
+        "totalGroups": stats.totalGroups,
+        "activeGroups": stats.activeGroups,
+        "totalMembers": stats.totalMembers,
+        "activeMembers": stats.activeMembers,
+        "totalCollection": stats.totalCollection,
+        "totalPending": stats.totalPending,
+        "overduePending": stats.overduePending,
+        "daily": {row["_id"]: row["amount"] for row in daily_rows},
+        "rebuiltAt": datetime.now()
+    }
+    update = {"$set": {DASHBOARD: doc}}
+    if new_version:
+        update["$inc"] = {"stats": 1}
+    await counters_collection.update_one({"_id": VERSIONS_ID}, update, upsert=True)
+    return doc
+
+async def get_stats() -> DashboardStats:
+    """Read the materialized stats, building the document on first use"""
+    versions = await counters_collection.find_one({"_id": VERSIONS_ID}, {"_id": 0, DASHBOARD: 1})
+    doc = (versions or {}).get(DASHBOARD)
+    if not doc or "rebuiltAt" not in doc:
+        doc = await rebuild_stats(new_version=False)
+
+    window_start = _day_key(_window_start())
+    daily = doc.get("daily", {})
+    expired = [day for day in daily if day < window_start]
+    if expired:
+        await counters_collection.update_one(
+            {"_id": VERSIONS_ID},
+            {"$unset": {f"{DASHBOARD}.daily.{day}": "" for day in expired}}
+        )
+
+    total_groups = doc.get("totalGroups", 0)
+    active_groups = doc.get("activeGroups", 0)
+    total_members = doc.get("totalMembers", 0)
+    active_members = doc.get("activeMembers", 0)
+
+    return DashboardStats(
+        totalGroups=total_groups,
+        activeGroups=active_groups,
+        closedGroups=total_groups - active_groups,
+        totalMembers=total_members,
+        activeMembers=active_members,
+        inactiveMembers=total_members - active_members,
+        totalCollection=doc.get("totalCollection", 0),
+        monthlyCollection=sum(amount for day, amount in daily.items() if day >= window_start),
+        totalPending=doc.get("totalPending", 0),
+        overduePending=doc.get("overduePending", 0)
+    )
@@ -1,5 +1,32 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import asyncio
+import re
+
+from stats import record_group_recalc, correct_member_change
+from cache import GroupEntry, invalidate_group, revalidate_group
+from conditional import bump_version
+
+def to_datetime(value) -> Optional[datetime]:
+    """Naive datetime for storage as a BSON date.
+
+    Accepts datetimes and ISO strings (the format dates were stored in
+    before). Aware values are converted to UTC, not to the server's zone:
+    the frontend sends dates picked in the browser as UTC midnight
+    (``toISOString()``), which a host west of UTC would otherwise store
+    as the previous day.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def to_local_datetime(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive local datetime, the form of timestamps stored from ``datetime.now()`` (e.g. paymentDate)"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
 
 def calculate_pending(join_date: datetime, emi_amount: float, emi_paid: int) -> float:
     """Calculate pending EMI amount till current month"""
@@ -14,35 +41,214 @@ def calculate_pending(join_date: datetime, emi_amount: float, emi_paid: int) ->
     
     return max(total_due - paid, 0)
 
+def normalize_name(name: str) -> str:
+    """Lowercased, whitespace-collapsed name used for indexed search"""
+    return " ".join((name or "").lower().split())
+
+def phone_digits(phone: str) -> str:
+    return "".join(ch for ch in (phone or "") if ch.isdigit())
+
+def search_fields(name: str, phone: str) -> dict:
+    """Derived fields backing /members/search.
+
+    The name's words are stored as an array so a match on any word is a
+    prefix scan of a multikey index, and phone digits are stored reversed
+    so a suffix lookup becomes an index-friendly prefix match.
+    """
+    name_lower = normalize_name(name)
+    digits = phone_digits(phone)
+    return {
+        "nameLower": name_lower,
+        "nameWords": name_lower.split(),
+        "phoneDigits": digits,
+        "phoneReversed": digits[::-1]
+    }
+
+def name_prefix_query(term: str) -> dict:
+    """Members whose name starts with ``term``.
+
+    Members created before the search fields existed have no nameLower
+    until ``batch.py search-fields`` (also run at startup) reaches them;
+    those are matched on the raw name, through the index's null keys.
+    """
+    escaped = re.escape(normalize_name(term))
+    return {
+        "$or": [
+            {"nameLower": {"$regex": f"^{escaped}"}},
+            {"nameLower": None, "name": {"$regex": f"^\\s*{escaped}", "$options": "i"}}
+        ]
+    }
+
+def paid_count_update(paid_delta: int, emi_amount: Optional[float]) -> list:
+    """Update pipeline that moves emiPaidCount by ``paid_delta`` atomically.
+
+    When the group's EMI is known, pendingAmount is re-derived server-side
+    with the same formula as calculate_pending, unless it was manually
+    overridden.
+    """
+    now = datetime.now()
+    paid = {"$add": [{"$ifNull": ["$emiPaidCount", 0]}, paid_delta]}
+    update = {"emiPaidCount": paid, "updatedAt": now}
+    
+    if emi_amount is not None:
+        # $toDate also covers joinDate strings not yet migrated by `batch.py dates`
+        join_date = {"$toDate": "$joinDate"}
+        months = {
+            "$add": [
+                {"$multiply": [{"$subtract": [now.year, {"$year": join_date}]}, 12]},
+                {"$subtract": [now.month, {"$month": join_date}]},
+                1
+            ]
+        }
+        pending = {
+            "$max": [
+                {"$subtract": [{"$multiply": [months, emi_amount]}, {"$multiply": [paid, emi_amount]}]},
+                0
+            ]
+        }
+        update["pendingAmount"] = {
+            "$cond": [{"$ifNull": ["$manualPendingOverride", False]}, "$pendingAmount", pending]
+        }
+    
+    return [{"$set": update}]
+
+def apply_paid_delta(member: dict, paid_delta: int, emi_amount: Optional[float]) -> dict:
+    """The member document as paid_count_update leaves it (for stats deltas)"""
+    paid = member.get("emiPaidCount", 0) + paid_delta
+    after = {**member, "emiPaidCount": paid}
+    if emi_amount is not None and not member.get("manualPendingOverride", False):
+        join_date = to_datetime(member["joinDate"]) if member.get("joinDate") else None
+        after["pendingAmount"] = calculate_pending(join_date, emi_amount, paid)
+    return after
+
+async def restate_with_emi(
+    member_id: str,
+    group_id: str,
+    entry: GroupEntry,
+    versions: dict,
+    before: Optional[dict],
+    after: Optional[dict],
+    members_collection
+):
+    """Correct a member write that used a cached group, if the group has since changed.
+
+    ``before``/``after`` are the member as recorded in the stats with
+    ``entry``'s EMI (``after`` is None for a delete), and ``versions``
+    what the write's bump returned. When the EMI turns out to be
+    different, pendingAmount is re-derived with the current one and the
+    stats are corrected.
+    """
+    current = await revalidate_group(group_id, entry, versions)
+    if current.emi_amount == entry.emi_amount:
+        return
+    
+    changed = []
+    corrected = None
+    if after is not None:
+        corrected = apply_paid_delta(after, 0, current.emi_amount)
+        await members_collection.update_one(
+            {"id": member_id, "groupId": group_id},
+            paid_count_update(0, current.emi_amount)
+        )
+        changed.append("members")
+    await correct_member_change(before, after, entry.emi_amount, corrected, current.emi_amount, *changed)
+
+def _group_values(group: dict, members_count: int) -> dict:
+    """EMI / vacancy values a group should hold for ``members_count`` active members"""
+    total_chit = group.get("totalChitAmount", 0)
+    return {
+        "membersCount": members_count,
+        "emiAmount": round(total_chit / members_count) if members_count > 0 else 0,
+        "vacancies": group.get("maxMembers", 0) - members_count
+    }
+
 async def recalc_group(group_id: str, groups_collection, members_collection):
     """Recalculate group EMI and counts"""
-    members = await members_collection.find({"groupId": group_id}).to_list(None)
-    active_members = [m for m in members if m.get("status") == "active"]
+    members_count = await members_collection.count_documents({"groupId": group_id, "status": "active"})
     
     group = await groups_collection.find_one({"id": group_id})
     if not group:
         return
     
-    members_count = len(active_members)
-    total_chit = group.get("totalChitAmount", 0)
-    emi_amount = round(total_chit / members_count) if members_count > 0 else 0
-    vacancies = group.get("maxMembers", 0) - members_count
+    values = _group_values(group, members_count)
     
+    await record_group_recalc(group, members_count, values["emiAmount"])
     await groups_collection.update_one(
         {"id": group_id},
-        {
-            "$set": {
-                "membersCount": members_count,
-                "emiAmount": emi_amount,
-                "vacancies": vacancies
-            }
-        }
+        {"$set": values}
     )
+    invalidate_group(group_id)
+    await bump_version("groups")
+
+# Per-group recalc in flight, and groups changed again while it ran
+_recalc_tasks = {}
+_recalc_dirty = set()
+
+async def _run_recalc(group_id: str, groups_collection, members_collection):
+    try:
+        while True:
+            _recalc_dirty.discard(group_id)
+            await recalc_group(group_id, groups_collection, members_collection)
+            if group_id not in _recalc_dirty:
+                break
+    finally:
+        _recalc_tasks.pop(group_id, None)
+
+async def request_recalc(group_id: str, groups_collection, members_collection):
+    """Recalculate a group, coalescing concurrent requests.
+
+    The first caller starts a recalc; callers arriving while it runs mark
+    the group dirty and wait for the same task, which re-runs once to
+    pick up their change. A burst of N membership changes therefore
+    costs at most two recalcs, and every caller still returns with the
+    group reflecting its own write. Coalescing is per worker process.
+    """
+    task = _recalc_tasks.get(group_id)
+    if task is None:
+        task = asyncio.create_task(_run_recalc(group_id, groups_collection, members_collection))
+        _recalc_tasks[group_id] = task
+    else:
+        _recalc_dirty.add(group_id)
+    await asyncio.shield(task)
+
+async def flush_recalcs():
+    """Wait for in-flight group recalcs (used on shutdown)"""
+    if _recalc_tasks:
+        await asyncio.gather(*_recalc_tasks.values(), return_exceptions=True)
+
+async def check_groups(groups_collection, members_collection, group_ids: Optional[List[str]] = None) -> List[dict]:
+    """Compare stored group counts/EMI/vacancies with the members collection.
+
+    Returns one entry per checked group with the stored and expected values.
+    """
+    group_query = {"id": {"$in": group_ids}} if group_ids is not None else {}
+    member_match = {"status": "active"}
+    if group_ids is not None:
+        member_match["groupId"] = {"$in": group_ids}
+    
+    counts = await members_collection.aggregate([
+        {"$match": member_match},
+        {"$group": {"_id": "$groupId", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    counts = {row["_id"]: row["count"] for row in counts}
+    
+    report = []
+    async for group in groups_collection.find(group_query, {"_id": 0}):
+        expected = _group_values(group, counts.get(group["id"], 0))
+        stored = {key: group.get(key, 0) for key in expected}
+        report.append({
+            "groupId": group["id"],
+            "name": group.get("name"),
+            "stored": stored,
+            "expected": expected,
+            "consistent": stored == expected
+        })
+    return report
 
-def format_date_display(date_str: str) -> str:
+def format_date_display(date_str) -> str:
     """Format date for display (DD-MM-YYYY)"""
     try:
-        dt = datetime.fromisoformat(date_str)
+        dt = to_datetime(date_str)
         return dt.strftime("%d-%m-%Y")
     except:
         return date_str
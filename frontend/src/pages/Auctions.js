@@ -1,12 +1,12 @@
 import React, { useState, useEffect } from 'react';
-import { auctionsAPI, groupsAPI, membersAPI } from '../services/api';
+import { auctionsAPI, groupsAPI } from '../services/api';
 
 const Auctions = () => {
   const [auctions, setAuctions] = useState([]);
-  const [filteredAuctions, setFilteredAuctions] = useState([]);
   const [groups, setGroups] = useState([]);
-  const [members, setMembers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showModal, setShowModal] = useState(false);
   const [editingAuction, setEditingAuction] = useState(null);
   
@@ -32,24 +32,34 @@ const Auctions = () => {
   const agentCodes = ['N08553', 'N08554', 'N08555', 'N08556', 'N08557', 'N08558'];
 
   useEffect(() => {
-    fetchData();
+    fetchGroups();
   }, []);
 
+  // The group filter is applied server-side; changing it starts again from the first page
   useEffect(() => {
-    applyFilters();
-  }, [selectedGroup, auctions]);
+    setNextCursor(null);
+    fetchAuctions();
+  }, [selectedGroup]);
 
-  const fetchData = async () => {
+  const fetchGroups = async () => {
     try {
-      const [auctionsRes, groupsRes, membersRes] = await Promise.all([
-        auctionsAPI.getAll(),
-        groupsAPI.getAll(),
-        membersAPI.getAll(),
-      ]);
-      setAuctions(auctionsRes.data);
+      const groupsRes = await groupsAPI.getAll();
       setGroups(groupsRes.data);
-      setMembers(membersRes.data);
-      setFilteredAuctions(auctionsRes.data);
+    } catch (error) {
+      console.error('Error fetching groups:', error);
+    }
+  };
+
+  const auctionParams = (after) => ({
+    groupNo: selectedGroup || undefined,
+    after,
+  });
+
+  const fetchAuctions = async () => {
+    try {
+      const auctionsPage = await auctionsAPI.getPage(auctionParams());
+      setAuctions(auctionsPage.items);
+      setNextCursor(auctionsPage.nextCursor);
     } catch (error) {
       console.error('Error fetching data:', error);
       alert('Failed to fetch data');
@@ -58,11 +68,20 @@ const Auctions = () => {
     }
   };
 
-  const applyFilters = () => {
-    if (!selectedGroup) {
-      setFilteredAuctions(auctions);
-    } else {
-      setFilteredAuctions(auctions.filter(a => a.groupNo === selectedGroup));
+  const fetchData = () => Promise.all([fetchAuctions(), fetchGroups()]);
+
+  const loadMoreAuctions = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await auctionsAPI.getPage(auctionParams(nextCursor));
+      setAuctions((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more auctions:', error);
+      alert('Failed to fetch data');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -262,7 +281,7 @@ const Auctions = () => {
               </tr>
             </thead>
             <tbody className="divide-y divide-gray-200">
-              {filteredAuctions.map((auction, index) => (
+              {auctions.map((auction, index) => (
                 <tr key={auction.id} className="hover:bg-gray-50">
                   <td className="px-4 py-3">{index + 1}</td>
                   <td className="px-4 py-3 font-semibold">{auction.groupNo}</td>
@@ -302,6 +321,17 @@ const Auctions = () => {
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div className="text-center p-4 border-t border-gray-200">
+            <button
+              onClick={loadMoreAuctions}
+              disabled={loadingMore}
+              className="px-6 py-2 border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Modal */}
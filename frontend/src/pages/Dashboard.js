@@ -18,6 +18,8 @@ const Dashboard = () => {
   });
   const [groups, setGroups] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showGroupModal, setShowGroupModal] = useState(false);
   const [editingGroup, setEditingGroup] = useState(null);
   const [formData, setFormData] = useState({
@@ -50,6 +52,7 @@ const Dashboard = () => {
       };
       
       let groupsData = [];
+      let groupsCursor = null;
 
       // Try to fetch stats
       try {
@@ -62,9 +65,10 @@ const Dashboard = () => {
 
       // Try to fetch groups (this is critical)
       try {
-        const groupsRes = await groupsAPI.getAll();
-        console.log('Dashboard groups:', groupsRes.data);
-        groupsData = groupsRes.data;
+        const groupsPage = await groupsAPI.getPage();
+        console.log('Dashboard groups:', groupsPage.items);
+        groupsData = groupsPage.items;
+        groupsCursor = groupsPage.nextCursor;
       } catch (groupsError) {
         console.error('Error fetching groups:', groupsError);
         alert('Failed to load groups. Please refresh the page.');
@@ -72,6 +76,7 @@ const Dashboard = () => {
 
       setStats(statsData);
       setGroups(groupsData);
+      setNextCursor(groupsCursor);
       
       console.log('State updated - Stats:', statsData);
       console.log('State updated - Groups:', groupsData);
@@ -84,6 +89,21 @@ const Dashboard = () => {
     }
   };
 
+  const loadMoreGroups = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await groupsAPI.getPage({ after: nextCursor });
+      setGroups((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more groups:', error);
+      alert('Failed to load groups. Please refresh the page.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     
@@ -153,7 +173,7 @@ const Dashboard = () => {
         console.log('Deleting group ID:', groupId);
         const response = await groupsAPI.delete(groupId);
         console.log('Delete response:', response);
-        alert('Group deleted successfully!');
+        alert('Group deletion started. Its members and payments are being removed.');
         await fetchDashboardData();
       } catch (error) {
         console.error('Error deleting group:', error);
@@ -260,7 +280,7 @@ const Dashboard = () => {
       <div className="bg-white rounded-xl shadow-md p-6 mb-8">
         <div className="flex justify-between items-center mb-6">
           <h2 className="text-2xl font-bold text-gray-800">
-            Chit Fund Groups ({groups.length} groups)
+            Chit Fund Groups ({Math.max(stats.totalGroups, groups.length)} groups)
           </h2>
           <button
             onClick={() => { resetForm(); setShowGroupModal(true); }}
@@ -329,6 +349,18 @@ const Dashboard = () => {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="text-center mt-6">
+            <button
+              onClick={loadMoreGroups}
+              disabled={loadingMore}
+              className="px-6 py-2 border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load More Groups'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Group Modal */}
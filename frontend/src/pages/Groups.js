@@ -6,6 +6,8 @@ const Groups = () => {
   const navigate = useNavigate();
   const [groups, setGroups] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showModal, setShowModal] = useState(false);
   const [editingGroup, setEditingGroup] = useState(null);
   const [formData, setFormData] = useState({
@@ -22,9 +24,10 @@ const Groups = () => {
   const fetchGroups = async () => {
     try {
       console.log('Fetching groups...');
-      const response = await groupsAPI.getAll();
-      console.log('Groups response:', response.data);
-      setGroups(response.data);
+      const page = await groupsAPI.getPage();
+      console.log('Groups response:', page.items);
+      setGroups(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error fetching groups:', error);
       console.error('Error details:', error.response || error.message);
@@ -34,6 +37,21 @@ const Groups = () => {
     }
   };
 
+  const loadMoreGroups = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await groupsAPI.getPage({ after: nextCursor });
+      setGroups((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching more groups:', error);
+      alert(`Failed to fetch groups: ${error.response?.data?.detail || error.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -80,7 +98,7 @@ const Groups = () => {
     if (window.confirm('Are you sure you want to delete this group? This will also delete all members.')) {
       try {
         await groupsAPI.delete(groupId);
-        alert('Group deleted successfully!');
+        alert('Group deletion started. Its members and payments are being removed.');
         fetchGroups();
       } catch (error) {
         console.error('Error deleting group:', error);
@@ -187,6 +205,18 @@ const Groups = () => {
       </div>
       )}
 
+      {nextCursor && (
+        <div className="text-center mt-6">
+          <button
+            onClick={loadMoreGroups}
+            disabled={loadingMore}
+            className="px-6 py-3 border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load More Groups'}
+          </button>
+        </div>
+      )}
+
       {/* Modal */}
       {showModal && (
         <div className="fixed inset-0 bg-black/50 flex items-center justify-center z-50 p-4">
@@ -45,12 +45,9 @@ const Members = () => {
 
   const fetchData = async () => {
     try {
-      const [groupRes, membersRes] = await Promise.all([
-        groupsAPI.getById(groupId),
-        membersAPI.getByGroup(groupId),
-      ]);
-      setGroup(groupRes.data);
-      setMembers(membersRes.data);
+      const response = await groupsAPI.getDetail(groupId);
+      setGroup(response.data.group);
+      setMembers(response.data.members);
     } catch (error) {
       console.error('Error fetching data:', error);
       alert('Failed to fetch data');
@@ -236,6 +233,10 @@ const Members = () => {
                   <span className="text-gray-600">EMI Paid</span>
                   <span className="font-semibold">{member.emiPaidCount}</span>
                 </div>
+                <div className="flex justify-between py-2 border-b border-gray-200">
+                  <span className="text-gray-600">Total Paid</span>
+                  <span className="font-semibold">{formatCurrency(member.totalPaid)}</span>
+                </div>
                 <div className="flex justify-between py-2 border-b border-gray-200">
                   <span className="text-gray-600">Pending</span>
                   <span className={`font-semibold ${member.pendingAmount > 0 ? 'text-red-600' : 'text-green-600'}`}>
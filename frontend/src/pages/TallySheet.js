@@ -1,10 +1,12 @@
 import React, { useState, useEffect } from 'react';
-import { membersAPI, groupsAPI } from '../services/api';
+import { groupsAPI, tallyAPI, PAGE_SIZE } from '../services/api';
 
 const TallySheet = () => {
   const [tallyData, setTallyData] = useState([]);
-  const [filteredData, setFilteredData] = useState([]);
+  const [summary, setSummary] = useState({ total: 0, totalPending: 0, totalPenalties: 0 });
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showRemindModal, setShowRemindModal] = useState(false);
   const [selectedMember, setSelectedMember] = useState(null);
   
@@ -21,37 +23,41 @@ const TallySheet = () => {
   });
 
   useEffect(() => {
-    fetchTallyData();
+    fetchGroups();
   }, []);
 
+  // Filters are applied server-side; debounce typing in the name box
   useEffect(() => {
-    applyFilters();
-  }, [filterGroup, filterName, tallyData]);
+    const timer = setTimeout(fetchTallyData, filterName ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [filterGroup, filterName]);
+
+  const fetchGroups = async () => {
+    try {
+      const groupsRes = await groupsAPI.getAll();
+      setAvailableGroups(groupsRes.data);
+    } catch (error) {
+      console.error('Error fetching groups:', error);
+    }
+  };
+
+  const tallyParams = (after) => ({
+    groupId: filterGroup || undefined,
+    name: filterName || undefined,
+    limit: PAGE_SIZE,
+    after,
+  });
 
   const fetchTallyData = async () => {
     try {
-      const [membersRes, groupsRes] = await Promise.all([
-        membersAPI.getAll(),
-        groupsAPI.getAll(),
-      ]);
-
-      const members = membersRes.data;
-      const groups = groupsRes.data;
-      
-      setAvailableGroups(groups);
-
-      // Include ALL members (not just those with pending)
-      const allMembers = members.map((m) => {
-        const group = groups.find((g) => g.id === m.groupId);
-        return {
-          ...m,
-          groupName: group?.name || 'Unknown',
-          groupEmi: group?.emiAmount || 0,
-        };
+      const response = await tallyAPI.get(tallyParams());
+      setTallyData(response.data.items);
+      setNextCursor(response.data.nextCursor);
+      setSummary({
+        total: response.data.total,
+        totalPending: response.data.totalPending,
+        totalPenalties: response.data.totalPenalties,
       });
-
-      setTallyData(allMembers);
-      setFilteredData(allMembers);
     } catch (error) {
       console.error('Error fetching tally data:', error);
       alert('Failed to fetch tally data');
@@ -60,22 +66,19 @@ const TallySheet = () => {
     }
   };
 
-  const applyFilters = () => {
-    let filtered = [...tallyData];
-
-    // Filter by group
-    if (filterGroup) {
-      filtered = filtered.filter((item) => item.groupName === filterGroup);
-    }
-
-    // Filter by name
-    if (filterName) {
-      filtered = filtered.filter((item) =>
-        item.name.toLowerCase().includes(filterName.toLowerCase())
-      );
+  const loadMoreTally = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await tallyAPI.get(tallyParams(nextCursor));
+      setTallyData((prev) => [...prev, ...response.data.items]);
+      setNextCursor(response.data.nextCursor);
+    } catch (error) {
+      console.error('Error fetching tally data:', error);
+      alert('Failed to fetch tally data');
+    } finally {
+      setLoadingMore(false);
     }
-
-    setFilteredData(filtered);
   };
 
   const handleRemindClick = (member) => {
@@ -107,6 +110,8 @@ KA Associates`;
     setShowRemindModal(true);
   };
 
+  // Keep in step with penalty_expression in backend/routes/tally.py, which
+  // totals the same rule over every filtered member
   const calculatePenalty = (member) => {
     // If no pending, no penalty
     if (member.pendingAmount <= 0) return 0;
@@ -162,8 +167,8 @@ KA Associates`;
     });
   };
 
-  const totalPending = filteredData.reduce((sum, item) => sum + item.pendingAmount, 0);
-  const totalPenalties = filteredData.reduce((sum, item) => sum + calculatePenalty(item), 0);
+  const totalPending = summary.totalPending;
+  const totalPenalties = summary.totalPenalties;
 
   if (loading) {
     return (
@@ -198,7 +203,7 @@ KA Associates`;
             >
               <option value="">All Groups</option>
               {availableGroups.map((group) => (
-                <option key={group.id} value={group.name}>
+                <option key={group.id} value={group.id}>
                   {group.name}
                 </option>
               ))}
@@ -233,7 +238,7 @@ KA Associates`;
           <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
             <div>
               <div className="text-sm opacity-90">Total Members</div>
-              <div className="text-3xl font-bold">{filteredData.length}</div>
+              <div className="text-3xl font-bold">{summary.total}</div>
             </div>
             <div>
               <div className="text-sm opacity-90">Total Pending</div>
@@ -268,7 +273,7 @@ KA Associates`;
               </tr>
             </thead>
             <tbody className="divide-y divide-gray-200">
-              {filteredData.map((item) => {
+              {tallyData.map((item) => {
                 const penalty = calculatePenalty(item);
                 const totalDue = item.pendingAmount + penalty;
                 
@@ -316,6 +321,17 @@ KA Associates`;
             </tbody>
           </table>
         </div>
+        {nextCursor && (
+          <div className="text-center p-4 border-t border-gray-200">
+            <button
+              onClick={loadMoreTally}
+              disabled={loadingMore}
+              className="px-6 py-2 border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Remind Modal - Same as before */}
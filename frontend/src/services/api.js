@@ -43,10 +43,26 @@ api.interceptors.response.use(
   }
 );
 
+// Default page size for lazily loaded lists
+export const PAGE_SIZE = 50;
+
+// Fetch one keyset page of a list endpoint, with any server-side filters;
+// resolves to { items, nextCursor }
+const getPage = (path) => async ({ limit = PAGE_SIZE, after, fields, ...filters } = {}) => {
+  const response = await api.get(path, { params: { limit, after, fields, ...filters } });
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
+};
+
 // Groups API - using trailing slashes to match backend routes exactly
 export const groupsAPI = {
   getAll: () => api.get('/api/groups/'),
+  getPage: getPage('/api/groups/'),
   getById: (id) => api.get(`/api/groups/${id}`),
+  // Group, members and per-member payment summaries in one request
+  getDetail: (id) => api.get(`/api/groups/${id}/detail`),
   create: (data) => api.post('/api/groups/', data),
   update: (id, data) => api.put(`/api/groups/${id}`, data),
   delete: (id) => api.delete(`/api/groups/${id}`),
@@ -55,6 +71,7 @@ export const groupsAPI = {
 // Members API
 export const membersAPI = {
   getAll: () => api.get('/api/members/'),
+  getPage: getPage('/api/members/'),
   getByGroup: (groupId) => api.get(`/api/members/group/${groupId}`),
   getById: (id) => api.get(`/api/members/${id}`),
   create: (data) => api.post('/api/members/', data),
@@ -67,6 +84,7 @@ export const membersAPI = {
 // Payments API
 export const paymentsAPI = {
   getAll: () => api.get('/api/payments/'),
+  getPage: getPage('/api/payments/'),
   getByMember: (memberId) => api.get(`/api/payments/member/${memberId}`),
   create: (data) => api.post('/api/payments/', data),
   delete: (id) => api.delete(`/api/payments/${id}`),
@@ -75,12 +93,18 @@ export const paymentsAPI = {
 // Auctions API
 export const auctionsAPI = {
   getAll: () => api.get('/api/auctions/'),
+  getPage: getPage('/api/auctions/'),
   getById: (id) => api.get(`/api/auctions/${id}`),
   create: (data) => api.post('/api/auctions/', data),
   update: (id, data) => api.put(`/api/auctions/${id}`, data),
   delete: (id) => api.delete(`/api/auctions/${id}`),
 };
 
+// Tally API - members joined with group name/EMI, filtered server-side
+export const tallyAPI = {
+  get: (params) => api.get('/api/tally', { params }),
+};
+
 // Dashboard API
 export const dashboardAPI = {
   getStats: () => api.get('/api/dashboard/stats'),
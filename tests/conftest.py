@@ -0,0 +1,111 @@
+"""
+Test setup: the backend runs against mongomock-motor, an in-memory
+MongoDB, so tests never need (or touch) a real server.
+
+mongomock lacks a few aggregation operators the backend uses; minimal
+versions are registered here for the shapes the app sends.
+
+Every collection call yields to the event loop first, as a round trip to
+a real server would, so concurrent requests interleave between queries.
+"""
+import asyncio
+import datetime
+import inspect
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Set before database.py loads .env, which does not override existing variables
+os.environ["MONGO_URL"] = "mongodb://localhost:27017"
+os.environ["DB_NAME"] = "chitfund_test"
+os.environ["PENDING_RECALC_HOUR"] = "off"
+
+import motor.motor_asyncio  # noqa: E402
+from mongomock import aggregate  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection  # noqa: E402
+
+motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+# Read preferences mean nothing to a single in-memory server
+AsyncMongoMockCollection.with_options = lambda self, **kwargs: self
+
+def _yielding(method):
+    async def call(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await method(self, *args, **kwargs)
+    return call
+
+for _name in dir(AsyncMongoMockCollection):
+    _method = getattr(AsyncMongoMockCollection, _name, None)
+    if not _name.startswith("_") and inspect.iscoroutinefunction(_method):
+        setattr(AsyncMongoMockCollection, _name, _yielding(_method))
+
+_convert = aggregate._Parser._handle_type_convertion_operator
+
+def _handle_convert(self, operator, values):
+    if operator == "$toDate":
+        value = self.parse(values)
+        if value is None or isinstance(value, datetime.datetime):
+            return value
+        return datetime.datetime.fromisoformat(value)
+    return _convert(self, operator, values)
+
+aggregate.type_convertion_operators.append("$toDate")
+aggregate._Parser._handle_type_convertion_operator = _handle_convert
+
+def _window_bound(bound, position, size, default):
+    if bound == "unbounded":
+        return default
+    if bound == "current":
+        return position
+    return min(max(position + bound, 0), size - 1)
+
+def _set_window_fields(in_collection, database, options):
+    """$sum over position-based (``documents``) windows, per partition"""
+    partitions = {}
+    for doc in in_collection:
+        doc = dict(doc)
+        key = None
+        if "partitionBy" in options:
+            key = aggregate._parse_expression(options["partitionBy"], doc, ignore_missing_keys=True)
+        partitions.setdefault(repr(key), []).append(doc)
+
+    output = []
+    for docs in partitions.values():
+        for key, direction in reversed(list(options.get("sortBy", {}).items())):
+            docs.sort(key=lambda doc: doc.get(key), reverse=direction == -1)
+        values = {}
+        for name, spec in options["output"].items():
+            if set(spec) - {"$sum", "window"} or set(spec.get("window", {})) - {"documents"}:
+                raise NotImplementedError(f"$setWindowFields shim: {spec}")
+            values[name] = [
+                aggregate._parse_expression(spec["$sum"], doc, ignore_missing_keys=True) or 0 for doc in docs
+            ]
+        for position, doc in enumerate(docs):
+            for name, spec in options["output"].items():
+                lower, upper = spec.get("window", {}).get("documents", ["unbounded", "unbounded"])
+                lo = _window_bound(lower, position, len(docs), 0)
+                hi = _window_bound(upper, position, len(docs), len(docs) - 1)
+                doc[name] = sum(values[name][lo:hi + 1])
+        output.extend(docs)
+    return output
+
+aggregate._PIPELINE_HANDLERS["$setWindowFields"] = _set_window_fields
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db():
+    """A fresh database per test"""
+    import database
+    from cache import group_cache
+
+    for name in await database.db.list_collection_names():
+        await database.db.drop_collection(name)
+    group_cache.invalidate(propagate=False)
+    yield database.db
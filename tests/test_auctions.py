@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from starlette.responses import Response
+
+from models import AuctionCreate
+from routes.auctions import create_auction, create_auctions_bulk, get_auction_summary, get_auctions, SUMMARY_ROLLUP_ID
+
+pytestmark = pytest.mark.anyio
+
+def _auction(groupNo="G1", agentCode="A1", status="Prized", previousArrear=0.0, currentAmount=100.0) -> AuctionCreate:
+    return AuctionCreate(
+        groupNo=groupNo, ticketNo="1", customerName="Customer", mobileNo="9000000000", appuiDate="2024-01-15",
+        instOngoing=1, status=status, previousArrear=previousArrear, currentAmount=currentAmount,
+        cumShare=10.0, toBeCollected=50.0, unclaimedAmt=0.0, agentCode=agentCode
+    )
+
+async def _summary(**kwargs):
+    params = {"groupNo": None, "agentCode": None, "rollup": False, "maxAge": 300}
+    return await get_auction_summary(**{**params, **kwargs})
+
+async def test_concurrent_creates_get_unique_consecutive_srnos(db):
+    singles = asyncio.gather(*(create_auction(_auction()) for _ in range(20)))
+    bulk = create_auctions_bulk([_auction() for _ in range(5)])
+    created, bulk_result = await asyncio.gather(singles, bulk)
+
+    bulk_srnos = [(await db.auctions.find_one({"id": row.id}))["srNo"] for row in bulk_result.results]
+    assert bulk_srnos == list(range(bulk_srnos[0], bulk_srnos[0] + 5))
+    assert sorted([a.srNo for a in created] + bulk_srnos) == list(range(1, 26))
+
+async def test_create_skips_a_srno_taken_behind_the_counter(db):
+    await db.auctions.create_index("srNo", unique=True)
+    await create_auction(_auction())
+    await db.auctions.insert_one({**_auction().model_dump(), "id": "manual", "srNo": 2})
+
+    auction = await create_auction(_auction())
+
+    assert auction.srNo == 3
+
+async def test_summary_buckets_match_the_fixture(db):
+    await create_auctions_bulk([
+        _auction(groupNo="G1", agentCode="A1", status="Prized", previousArrear=0),
+        _auction(groupNo="G1", agentCode="A2", status="Non-Prx", previousArrear=4999),
+        _auction(groupNo="G2", agentCode="A1", status="Non-Prx", previousArrear=5000),
+        _auction(groupNo="G2", agentCode="A1", status="Prized", previousArrear=250000),
+        _auction(groupNo="G2", agentCode="A2", status="Non-Prx", previousArrear=-10),
+    ])
+
+    summary = await _summary()
+
+    assert (summary["totals"]["count"], summary["totals"]["prized"]) == (5, 2)
+    assert summary["totals"]["previousArrear"] == 259989
+    assert summary["totals"]["currentAmount"] == 500
+    assert [(row["key"], row["count"], row["prized"]) for row in summary["byGroup"]] == [("G1", 2, 1), ("G2", 3, 1)]
+    assert [(row["key"], row["count"]) for row in summary["byAgent"]] == [("A1", 3), ("A2", 2)]
+    assert [(row["key"], row["count"]) for row in summary["byStatus"]] == [("Non-Prx", 3), ("Prized", 2)]
+    buckets = {row["key"]: (row["count"], row["previousArrear"]) for row in summary["arrearBuckets"]}
+    assert buckets == {"0-1": (1, 0), "1-5000": (1, 4999), "5000-25000": (1, 5000), "100000+": (1, 250000), "other": (1, -10)}
+
+    filtered = await _summary(groupNo="G1")
+    assert filtered["totals"]["count"] == 2
+
+async def test_summary_rollup_is_stored_and_refreshed_when_old(db):
+    await create_auctions_bulk([_auction(previousArrear=10), _auction(previousArrear=20)])
+
+    rollup = await _summary(rollup=True)
+    stored = await db.stats.find_one({"_id": SUMMARY_ROLLUP_ID}, {"_id": 0})
+    assert stored["totals"] == rollup["totals"] == (await _summary())["totals"]
+
+    await create_auction(_auction(previousArrear=30))
+    # Fresh enough: the stored copy is served as is
+    assert (await _summary(rollup=True))["totals"]["count"] == 2
+    refreshed = await _summary(rollup=True, maxAge=0)
+    assert refreshed["totals"]["count"] == 3
+    assert (await db.stats.find_one({"_id": SUMMARY_ROLLUP_ID}))["totals"]["count"] == 3
+
+async def test_auction_pages_filter_by_group_on_the_server(db):
+    await create_auctions_bulk([_auction(groupNo=f"G{i % 3}") for i in range(9)])
+
+    srnos = []
+    after = None
+    while True:
+        response = Response()
+        page = await get_auctions(response, limit=2, after=after, fields=None, groupNo="G1")
+        srnos += [auction["srNo"] for auction in page]
+        assert all(auction["groupNo"] == "G1" for auction in page)
+        after = response.headers.get("x-next-cursor")
+        if not after:
+            break
+
+    assert srnos == [2, 5, 8]
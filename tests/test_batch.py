@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import batch
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.groups import create_group
+from routes.members import create_member
+from routes.payments import create_payment, delete_payment
+from stats import aggregate_dashboard_stats, get_stats, rebuild_stats
+
+pytestmark = pytest.mark.anyio
+
+EMI = 10_000
+
+async def _members(count: int, months: int = 6):
+    group = await create_group(GroupCreate(name="Batch", totalChitAmount=EMI * 10, maxMembers=10))
+    join_date = datetime.now() - timedelta(days=31 * months)
+    members = [
+        await create_member(MemberCreate(
+            name=f"Member {i}", phone=f"90000000{i:02d}", groupId=group.id, bcHolder="TEST", joinDate=join_date
+        ))
+        for i in range(count)
+    ]
+    return group, members
+
+async def _assert_stats_match():
+    stored = await get_stats()
+    actual = await aggregate_dashboard_stats()
+    assert stored.totalPending == actual.totalPending
+    assert stored.overduePending == actual.overduePending
+
+async def test_recompute_pending_skips_deltas_of_members_paid_meanwhile(db, monkeypatch):
+    group, members = await _members(3)
+    # Stale stored values, as after a month rollover
+    await db.members.update_many({}, {"$set": {"pendingAmount": 0}})
+    await rebuild_stats()
+
+    recompute_chunk = batch._recompute_chunk
+
+    async def pay_first_member_then_recompute(chunk, *args):
+        await create_payment(PaymentCreate(groupId=group.id, memberId=members[0].id, amount=EMI, emiNo=1, paidBy="test"))
+        return await recompute_chunk(chunk, *args)
+
+    monkeypatch.setattr(batch, "_recompute_chunk", pay_first_member_then_recompute)
+    report = await batch.recompute_pending()
+
+    assert report["changed"] == 2
+    assert report["statsRebuilt"]
+    await _assert_stats_match()
+
+async def test_reconcile_fixes_drifted_paid_counts(db):
+    group, members = await _members(2)
+    await create_payment(PaymentCreate(groupId=group.id, memberId=members[0].id, amount=EMI, emiNo=1, paidBy="test"))
+    # Drifted long ago, outside the settle window
+    await db.members.update_one(
+        {"id": members[1].id},
+        {"$set": {"emiPaidCount": 4, "updatedAt": datetime.now() - timedelta(days=1)}}
+    )
+    await db.members.update_one({"id": members[0].id}, {"$set": {"updatedAt": datetime.now() - timedelta(days=1)}})
+    await db.payments.update_many({}, {"$set": {"paymentDate": datetime.now() - timedelta(days=1)}})
+    await rebuild_stats()
+
+    report = await batch.reconcile_paid_counts()
+
+    assert report["mismatched"] == 1
+    assert (await db.members.find_one({"id": members[1].id}))["emiPaidCount"] == 0
+    await _assert_stats_match()
+
+@pytest.mark.parametrize("racing", ["create", "delete"])
+async def test_reconcile_leaves_members_with_payments_in_flight(db, monkeypatch, racing):
+    group, members = await _members(1)
+    member_id = members[0].id
+    payment = await create_payment(PaymentCreate(groupId=group.id, memberId=member_id, amount=EMI, emiNo=1, paidBy="test"))
+    await db.members.update_one({"id": member_id}, {"$set": {"updatedAt": datetime.now() - timedelta(days=1)}})
+    await db.payments.update_many({}, {"$set": {"paymentDate": datetime.now() - timedelta(days=1)}})
+    await rebuild_stats()
+
+    # Each write path, stopped after it moved the paid count but before the payment was written
+    insert_one, delete_one = db.payments.insert_one, db.payments.delete_one
+    reconciled = {}
+
+    async def reconcile_first(*args, **kwargs):
+        reconciled.update(await batch.reconcile_paid_counts())
+        return await (insert_one if racing == "create" else delete_one)(*args, **kwargs)
+
+    if racing == "create":
+        monkeypatch.setattr(type(db.payments), "insert_one", lambda self, *a, **k: reconcile_first(*a, **k))
+        await create_payment(PaymentCreate(groupId=group.id, memberId=member_id, amount=EMI, emiNo=1, paidBy="test"))
+    else:
+        monkeypatch.setattr(type(db.payments), "delete_one", lambda self, *a, **k: reconcile_first(*a, **k))
+        await delete_payment(payment.id)
+
+    assert reconciled["skipped"] == 1
+    stored = await db.members.find_one({"id": member_id})
+    assert stored["emiPaidCount"] == await db.payments.count_documents({"memberId": member_id})
+    await _assert_stats_match()
+
+async def test_migrate_dates_makes_string_dates_visible_to_range_queries(db):
+    group, members = await _members(2)
+    paid = datetime(2024, 3, 5, 10, 30)
+    await db.payments.insert_many([
+        {"id": "legacy", "memberId": members[0].id, "groupId": group.id, "amount": EMI, "paymentDate": paid.isoformat()},
+        {"id": "junk", "memberId": members[1].id, "groupId": group.id, "amount": EMI, "paymentDate": "not a date"},
+    ])
+    in_march = {"paymentDate": {"$gte": datetime(2024, 3, 1), "$lt": datetime(2024, 4, 1)}}
+    assert await db.payments.count_documents(in_march) == 0
+
+    report = await batch.migrate_dates()
+
+    assert report["payments"] == {"converted": 1, "failed": 1}
+    assert await db.payments.count_documents(in_march) == 1
+    # Nothing left to convert: a re-run, as at every startup, writes nothing
+    assert (await batch.migrate_dates())["payments"] == {"converted": 0, "failed": 1}
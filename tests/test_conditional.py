@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.dashboard import get_dashboard_stats
+from routes.groups import create_group, get_groups
+from routes.members import create_member, get_members_by_group
+from routes.payments import create_payment
+
+pytestmark = pytest.mark.anyio
+
+def _request(etag=None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+async def _get(route, *args, etag=None, **kwargs):
+    """(status, ETag) of a conditional GET"""
+    response = Response()
+    result = await route(*args, request=_request(etag), response=response, **kwargs)
+    target = result if isinstance(result, Response) else response
+    return target.status_code, target.headers["etag"]
+
+async def _group_with_member(name):
+    group = await create_group(GroupCreate(name=name, totalChitAmount=100_000, maxMembers=10))
+    member = await create_member(MemberCreate(
+        name=f"{name} Member", phone="9000000000", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()
+    ))
+    return group, member
+
+async def _groups(etag=None):
+    return await _get(get_groups, etag=etag, limit=None, after=None, fields=None)
+
+async def test_groups_list_is_304_until_a_group_changes(db):
+    await _group_with_member("First")
+    status, etag = await _groups()
+    assert status == 200
+
+    assert await _groups(etag) == (304, etag)
+
+    await create_group(GroupCreate(name="Second", totalChitAmount=100_000, maxMembers=10))
+    status, changed = await _groups(etag)
+    assert status == 200 and changed != etag
+
+async def test_dashboard_stats_are_304_until_a_write(db):
+    group, member = await _group_with_member("Stats")
+    status, etag = await _get(get_dashboard_stats)
+    assert status == 200
+
+    assert await _get(get_dashboard_stats, etag=etag) == (304, etag)
+
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=1000, emiNo=1, paidBy="test"))
+    status, changed = await _get(get_dashboard_stats, etag=etag)
+    assert status == 200 and changed != etag
+
+async def test_members_by_group_etag_is_per_group(db):
+    first, _ = await _group_with_member("First")
+    second, _ = await _group_with_member("Second")
+    status, etag = await _get(get_members_by_group, first.id)
+    assert status == 200
+
+    assert await _get(get_members_by_group, first.id, etag=etag) == (304, etag)
+    # The other group's list is not the same representation
+    assert (await _get(get_members_by_group, second.id, etag=etag))[0] == 200
+
+    await create_member(MemberCreate(
+        name="Joiner", phone="9000000002", groupId=first.id, bcHolder="TEST", joinDate=datetime.now()
+    ))
+    status, changed = await _get(get_members_by_group, first.id, etag=etag)
+    assert status == 200 and changed != etag
@@ -0,0 +1,15 @@
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+import database
+
+pytestmark = pytest.mark.anyio
+
+async def test_warm_pool_logs_instead_of_raising_when_mongodb_is_down(db, monkeypatch, caplog):
+    async def unreachable(*args, **kwargs):
+        raise ServerSelectionTimeoutError("No servers found")
+
+    monkeypatch.setattr(database.db, "command", unreachable)
+
+    assert await database.warm_pool() == 0
+    assert "Failed to warm the connection pool" in caplog.text
@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from models import GroupCreate, Member, MemberCreate, Payment, PaymentCreate
+from routes.groups import create_group
+from routes.members import create_member, export_members
+from routes.payments import create_payment, export_payments
+
+pytestmark = pytest.mark.anyio
+
+async def _member_with_payment():
+    group = await create_group(GroupCreate(name="Export", totalChitAmount=100_000, maxMembers=10))
+    member = await create_member(MemberCreate(
+        name="Export Member", phone="9000000000", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()
+    ))
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=1000, emiNo=1, paidBy="test"))
+
+async def _body(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+async def _ndjson_keys(response) -> set:
+    rows = [json.loads(line) for line in (await _body(response)).splitlines()]
+    assert rows
+    return set().union(*rows)
+
+async def _csv_keys(response) -> set:
+    rows = list(csv.reader(io.StringIO(await _body(response))))
+    assert len(rows) > 1
+    return set(rows[0])
+
+async def test_member_export_holds_only_model_fields(db):
+    await _member_with_payment()
+
+    ndjson = await _ndjson_keys(await export_members(fmt="ndjson", groupId=None, from_date=None, to_date=None))
+    csv_keys = await _csv_keys(await export_members(fmt="csv", groupId=None, from_date=None, to_date=None))
+
+    assert ndjson == set(Member.model_fields)
+    assert csv_keys == set(Member.model_fields)
+
+async def test_payment_export_holds_only_model_fields(db):
+    await _member_with_payment()
+
+    ndjson = await _ndjson_keys(await export_payments(fmt="ndjson", groupId=None, from_date=None, to_date=None))
+    csv_keys = await _csv_keys(await export_payments(fmt="csv", groupId=None, from_date=None, to_date=None))
+
+    assert ndjson == set(Payment.model_fields)
+    assert csv_keys == set(Payment.model_fields)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from models import GroupCreate, MemberCreate, PaymentCreate
+import utils
+from routes.admin import check_group_consistency, fix_group_consistency
+from routes.groups import create_group, get_group_detail
+from routes.members import create_member
+from routes.payments import create_payment
+
+pytestmark = pytest.mark.anyio
+
+def _request(etag=None) -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+async def _detail(group_id, etag=None):
+    return await get_group_detail(group_id, _request(etag), Response())
+
+async def _group(name):
+    return await create_group(GroupCreate(name=name, totalChitAmount=100_000, maxMembers=10))
+
+async def test_detail_of_a_missing_group_is_404_even_with_a_matching_etag(db):
+    group = await _group("Real")
+    etag = (await _detail(group.id)).headers["etag"]
+
+    with pytest.raises(HTTPException) as error:
+        await _detail("missing", etag)
+
+    assert error.value.status_code == 404
+
+async def test_detail_etag_is_per_group(db):
+    first, second = await _group("First"), await _group("Second")
+    etag = (await _detail(first.id)).headers["etag"]
+
+    assert (await _detail(first.id, etag)).status_code == 304
+    assert (await _detail(second.id, etag)).status_code == 200
+
+async def test_detail_summaries_follow_the_member(db):
+    group, other = await _group("Own"), await _group("Other")
+    member = await create_member(MemberCreate(
+        name="Payer", phone="9000000000", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()
+    ))
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=500, emiNo=1, paidBy="test"))
+    # Recorded against the wrong group before groupId was checked
+    await db.payments.update_many({}, {"$set": {"groupId": other.id}})
+
+    detail = await _detail(group.id)
+
+    members = json.loads(detail.body)["members"]
+    assert members[0]["paymentsCount"] == 1
+    assert members[0]["totalPaid"] == 500
+
+async def test_consistency_check_only_reads_and_fix_recalculates(db):
+    group = await _group("Drifted")
+    await create_member(MemberCreate(name="A", phone="9000000000", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()))
+    await db.groups.update_one({"id": group.id}, {"$set": {"membersCount": 5}})
+
+    report = await check_group_consistency(groupId=None)
+    assert [entry["groupId"] for entry in report["inconsistent"]] == [group.id]
+    assert (await db.groups.find_one({"id": group.id}))["membersCount"] == 5
+
+    fixed = await fix_group_consistency(groupId=None)
+    assert fixed["fixed"] == [group.id]
+    assert (await db.groups.find_one({"id": group.id}))["membersCount"] == 1
+    assert (await check_group_consistency(groupId=None))["inconsistent"] == []
+
+async def test_concurrent_recalc_requests_share_one_recalculation(db, monkeypatch):
+    group = await _group("Busy")
+    recalc_group = utils.recalc_group
+    calls = 0
+
+    async def counting(*args):
+        nonlocal calls
+        calls += 1
+        await recalc_group(*args)
+
+    monkeypatch.setattr(utils, "recalc_group", counting)
+    await asyncio.gather(*(utils.request_recalc(group.id, db.groups, db.members) for _ in range(10)))
+
+    assert calls == 1
+
+async def test_recalc_requested_while_one_runs_reruns_once(db, monkeypatch):
+    group = await _group("Busy")
+    recalc_group = utils.recalc_group
+    started = asyncio.Event()
+    calls = 0
+
+    async def counting(*args):
+        nonlocal calls
+        calls += 1
+        started.set()
+        await recalc_group(*args)
+
+    monkeypatch.setattr(utils, "recalc_group", counting)
+    first = asyncio.ensure_future(utils.request_recalc(group.id, db.groups, db.members))
+    await started.wait()
+    await asyncio.gather(first, *(utils.request_recalc(group.id, db.groups, db.members) for _ in range(10)))
+
+    assert calls == 2
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.groups import create_group, delete_group
+from routes.members import create_member, delete_member
+from routes.payments import create_payment
+from stats import aggregate_dashboard_stats, get_stats, rebuild_stats
+
+pytestmark = pytest.mark.anyio
+
+EMI = 10_000
+
+async def _group_with_members(count: int):
+    group = await create_group(GroupCreate(name="Doomed", totalChitAmount=EMI * 10, maxMembers=10))
+    members = []
+    for i in range(count):
+        member = await create_member(MemberCreate(
+            name=f"Member {i}", phone=f"90000000{i:02d}", groupId=group.id, bcHolder="TEST",
+            joinDate=datetime.now() - timedelta(days=62)
+        ))
+        await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test"))
+        members.append(member)
+    await rebuild_stats()
+    return group, members
+
+async def _wait_for_jobs():
+    await asyncio.gather(*list(jobs._running.values()), return_exceptions=True)
+
+async def _assert_stats_match():
+    stored = (await get_stats()).model_dump()
+    actual = (await aggregate_dashboard_stats()).model_dump()
+    assert stored == actual
+
+async def test_delete_group_reports_pending_and_keeps_stats_exact(db):
+    group, _ = await _group_with_members(3)
+
+    response = await delete_group(group.id)
+    await _wait_for_jobs()
+
+    assert response["status"] == "pending"
+    assert "deleted" not in response
+    job = await db.jobs.find_one({"id": response["jobId"]})
+    assert job["status"] == "done"
+    assert job["progress"]["membersDeleted"] == 3
+    assert not job["progress"].get("rebuildStats")
+    await _assert_stats_match()
+
+async def test_member_deleted_during_the_cascade_is_counted_once(db, monkeypatch):
+    group, members = await _group_with_members(3)
+    checkpoint = jobs._checkpoint
+
+    async def delete_a_member_first(job, **progress):
+        in_flight = progress.get("inFlight")
+        if in_flight and in_flight["counter"] == "membersDeleted":
+            await delete_member(members[0].id)
+        await checkpoint(job, **progress)
+
+    monkeypatch.setattr(jobs, "_checkpoint", delete_a_member_first)
+    response = await delete_group(group.id)
+    await _wait_for_jobs()
+
+    job = await db.jobs.find_one({"id": response["jobId"]})
+    assert job["progress"]["membersDeleted"] == 2
+    assert job["progress"]["rebuildStats"]
+    await _assert_stats_match()
+
+async def test_cascade_resumed_after_dying_between_delete_and_bump(db, monkeypatch):
+    group, _ = await _group_with_members(3)
+    bump = jobs.bump
+    calls = 0
+
+    async def die_on_first_member_bump(deltas):
+        nonlocal calls
+        if "totalMembers" in deltas:
+            calls += 1
+            if calls == 1:
+                raise asyncio.CancelledError
+        await bump(deltas)
+
+    monkeypatch.setattr(jobs, "bump", die_on_first_member_bump)
+    response = await delete_group(group.id)
+    await _wait_for_jobs()
+    assert (await db.jobs.find_one({"id": response["jobId"]}))["status"] == "running"
+    assert await db.members.count_documents({}) == 0
+
+    await jobs.run_job(response["jobId"])
+
+    job = await db.jobs.find_one({"id": response["jobId"]})
+    assert job["status"] == "done"
+    assert job["progress"]["rebuildStats"]
+    await _assert_stats_match()
+
+async def test_cascade_deletes_payments_filed_under_another_group(db):
+    group, members = await _group_with_members(2)
+    other = await create_group(GroupCreate(name="Survivor", totalChitAmount=EMI * 10, maxMembers=10))
+    await db.payments.update_one({"memberId": members[0].id}, {"$set": {"groupId": other.id}})
+    await db.payments.update_one({"memberId": members[1].id}, {"$unset": {"groupId": ""}})
+
+    response = await delete_group(group.id)
+    await _wait_for_jobs()
+
+    job = await db.jobs.find_one({"id": response["jobId"]})
+    assert job["status"] == "done"
+    assert job["progress"]["paymentsDeleted"] == 2
+    assert await db.payments.count_documents({}) == 0
+    await _assert_stats_match()
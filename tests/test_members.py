@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+import io
+import time
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from batch import backfill_search_fields
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.groups import create_group
+import routes.members
+from routes.members import create_member, get_member, get_member_ledger, import_members, search_members
+from routes.payments import create_payment
+from routes.tally import get_tally
+from stats import aggregate_dashboard_stats, get_stats
+
+pytestmark = pytest.mark.anyio
+
+async def _group_with(*names):
+    group = await create_group(GroupCreate(name="Search", totalChitAmount=100_000, maxMembers=10))
+    for i, name in enumerate(names):
+        await create_member(MemberCreate(
+            name=name, phone=f"90000000{i:02d}", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()
+        ))
+    return group
+
+async def _search(q):
+    return [(hit.name, hit.match) for hit in await search_members(q=q, limit=20)]
+
+async def test_search_ranks_exact_prefix_then_word(db):
+    await _group_with("Ravi Kumar", "Kumar", "Kumaraswamy", "Anil Kumaran", "Ravikumar")
+
+    assert await _search("kumar") == [
+        ("Kumar", "exact"), ("Kumaraswamy", "prefix"), ("Anil Kumaran", "word"), ("Ravi Kumar", "word")
+    ]
+
+async def test_search_matches_word_prefixes_only(db):
+    await _group_with("Ravikumar")
+
+    assert await _search("kumar") == []
+
+async def test_members_without_search_fields_are_still_found(db):
+    group = await _group_with("Legacy Member")
+    await db.members.update_many({}, {"$unset": {"nameLower": "", "nameWords": "", "phoneDigits": "", "phoneReversed": ""}})
+
+    assert await _search("legacy") == [("Legacy Member", "prefix")]
+    tally = await get_tally(groupId=group.id, name="legacy", pendingOnly=False, order="desc", limit=100, after=None)
+    assert [m.name for m in tally.items] == ["Legacy Member"]
+
+    assert (await backfill_search_fields())["updated"] == 1
+    assert (await db.members.find_one({}))["nameWords"] == ["legacy", "member"]
+    assert await _search("member") == [("Legacy Member", "word")]
+
+async def test_join_date_from_the_browser_keeps_its_calendar_day(db, monkeypatch):
+    # A server west of UTC, where local conversion would land on the previous day
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        group = await create_group(GroupCreate(name="Dates", totalChitAmount=100_000, maxMembers=10))
+        member = await create_member(MemberCreate(
+            name="Browser", phone="9000000000", groupId=group.id, bcHolder="TEST",
+            joinDate="2024-03-01T00:00:00.000Z"
+        ))
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert member.joinDate == datetime(2024, 3, 1)
+
+async def _member_with_payments(amounts):
+    group = await create_group(GroupCreate(name="Ledger", totalChitAmount=100_000, maxMembers=10))
+    member = await create_member(MemberCreate(
+        name="Ledger Member", phone="9000000000", groupId=group.id, bcHolder="TEST",
+        joinDate=datetime.now() - timedelta(days=31 * len(amounts))
+    ))
+    other = await create_member(MemberCreate(
+        name="Other Member", phone="9000000001", groupId=group.id, bcHolder="TEST", joinDate=datetime.now()
+    ))
+    for amount in amounts:
+        await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=amount, emiNo=1, paidBy="test"))
+        await create_payment(PaymentCreate(groupId=group.id, memberId=other.id, amount=1, emiNo=1, paidBy="test"))
+    return member
+
+async def test_ledger_running_totals_continue_across_pages(db):
+    amounts = [100, 200, 300, 400, 500]
+    member = await _member_with_payments(amounts)
+
+    first = await get_member_ledger(member.id, limit=2, after=None)
+    items = list(first.items)
+    cursor = first.nextCursor
+    while cursor:
+        page = await get_member_ledger(member.id, limit=2, after=cursor)
+        assert page.consistent is None
+        items += page.items
+        cursor = page.nextCursor
+
+    assert [item.amount for item in items] == amounts
+    assert [item.runningPaidCount for item in items] == [1, 2, 3, 4, 5]
+    assert [item.runningPaid for item in items] == [100, 300, 600, 1000, 1500]
+    # Every payment was made this month, so the last balance is the member's current one
+    assert items[-1].pendingAfter == (await get_member(member.id))["pendingAmount"]
+    assert (first.paymentsCount, first.totalPaid, first.emiPaidCount) == (5, 1500, 5)
+    assert first.consistent is True
+
+async def test_ledger_flags_a_paid_count_that_disagrees_with_the_payments(db):
+    member = await _member_with_payments([100, 200])
+    await db.members.update_one({"id": member.id}, {"$set": {"emiPaidCount": 3}})
+
+    ledger = await get_member_ledger(member.id, limit=10, after=None)
+
+    assert (ledger.paymentsCount, ledger.emiPaidCount) == (2, 3)
+    assert ledger.consistent is False
+
+async def _import(text: str):
+    return await import_members(UploadFile(io.BytesIO(text.encode("utf-8-sig")), filename="members.csv"))
+
+async def test_import_maps_headers_and_fills_search_fields(db):
+    group = await create_group(GroupCreate(name="Import", totalChitAmount=100_000, maxMembers=10))
+
+    result = await _import(
+        " name , phone,groupId,bcHolder,joinDate,email,notes\n"
+        f"Ravi  Kumar,+91 98450-12345,{group.id},TEST,2024-01-15,,ignored\n"
+    )
+
+    assert (result.imported, result.failed) == (1, 0)
+    member = await db.members.find_one({}, {"_id": 0})
+    assert member["name"] == "Ravi  Kumar"
+    assert member["email"] == ""
+    assert "notes" not in member
+    assert member["joinDate"] == datetime(2024, 1, 15)
+    assert (member["nameLower"], member["nameWords"]) == ("ravi kumar", ["ravi", "kumar"])
+    assert (member["phoneDigits"], member["phoneReversed"]) == ("919845012345", "543210548919")
+    assert (await db.groups.find_one({"id": group.id}))["membersCount"] == 1
+
+async def test_import_reports_bad_rows_by_line_and_keeps_the_rest(db, monkeypatch):
+    monkeypatch.setattr(routes.members, "IMPORT_CHUNK_SIZE", 2)
+    group = await create_group(GroupCreate(name="Import", totalChitAmount=100_000, maxMembers=10))
+
+    result = await _import(
+        "name,phone,groupId,bcHolder,joinDate\n"
+        f"Good One,9000000001,{group.id},TEST,2024-01-15\n"
+        f"Bad Date,9000000002,{group.id},TEST,someday\n"
+        "No Group,9000000003,missing,TEST,2024-01-15\n"
+        f",9000000004,{group.id},TEST,2024-01-15\n"
+        f"Good Two,9000000005,{group.id},TEST,2024-01-15\n"
+    )
+
+    assert (result.imported, result.failed) == (2, 3)
+    assert [(error.index, error.status) for error in result.errors] == [(3, "error"), (4, "error"), (5, "error")]
+    assert "joinDate" in result.errors[0].detail
+    assert result.errors[1].detail == "Invalid group"
+    assert "name" in result.errors[2].detail
+    assert sorted(m["name"] for m in await db.members.find({}).to_list(None)) == ["Good One", "Good Two"]
+    assert await get_stats() == await aggregate_dashboard_stats()
+
+async def test_import_keeps_duplicate_rows_as_separate_members(db):
+    group = await create_group(GroupCreate(name="Import", totalChitAmount=100_000, maxMembers=10))
+    row = f"Twin,9000000001,{group.id},TEST,2024-01-15\n"
+
+    result = await _import("name,phone,groupId,bcHolder,joinDate\n" + row + row)
+
+    assert (result.imported, result.failed) == (2, 0)
+    members = await db.members.find({}).to_list(None)
+    assert len({m["id"] for m in members}) == 2
+    group_doc = await db.groups.find_one({"id": group.id})
+    assert (group_doc["membersCount"], group_doc["emiAmount"]) == (2, 50_000)
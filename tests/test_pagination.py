@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, keyset_filter, paginate
+
+pytestmark = pytest.mark.anyio
+
+SORT_KEYS = ["paymentDate", "id"]
+
+async def _seed(db):
+    docs = [
+        {"id": "a", "paymentDate": datetime(2024, 1, 1)},
+        {"id": "b"},
+        {"id": "c", "paymentDate": None},
+        {"id": "d", "paymentDate": datetime(2024, 1, 1)},
+        {"id": "e", "paymentDate": datetime(2024, 2, 1)},
+        {"id": "f"},
+    ]
+    await db.payments.insert_many(docs)
+    return docs
+
+async def _walk(collection, direction: int, limit: int = 2) -> list:
+    """Every id, reading one page at a time through encoded cursors"""
+    seen = []
+    query = {}
+    while True:
+        docs = await collection.find(query, {"_id": 0}).sort(
+            [(key, direction) for key in SORT_KEYS]
+        ).limit(limit).to_list(limit)
+        seen += [doc["id"] for doc in docs]
+        if len(docs) < limit:
+            return seen
+        values = decode_cursor(encode_cursor(docs[-1], SORT_KEYS), SORT_KEYS)
+        query = keyset_filter(SORT_KEYS, values, direction)
+
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_pages_include_null_and_missing_sort_keys(db, direction):
+    await _seed(db)
+    expected = ["b", "c", "f", "a", "d", "e"]
+    if direction == -1:
+        expected = expected[::-1]
+
+    assert await _walk(db.payments, direction) == expected
+
+async def test_paginate_walks_past_null_sort_keys(db):
+    await _seed(db)
+    seen, after = [], None
+    while True:
+        docs, after = await paginate(db.payments, {}, SORT_KEYS, limit=2, after=after)
+        seen += [doc["id"] for doc in docs]
+        if not after:
+            break
+
+    assert seen == ["b", "c", "f", "a", "d", "e"]
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.responses import Response
+
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.groups import create_group
+from routes.members import create_member, get_member
+from routes.payments import create_payment, create_payments_bulk, delete_payment, get_payments
+import database
+from cache import get_group
+from conditional import bump_version, get_versions
+from stats import get_stats, aggregate_dashboard_stats
+from utils import calculate_pending, to_datetime
+
+pytestmark = pytest.mark.anyio
+
+TASKS = 50
+EMI = 1_000_000  # a single active member carries the whole chit
+
+async def _member_with_history(months: int):
+    group = await create_group(GroupCreate(name="Concurrency", totalChitAmount=EMI, maxMembers=10))
+    # Joined long enough ago that pending stays positive after every payment
+    join_date = datetime.now() - timedelta(days=31 * months)
+    member = await create_member(MemberCreate(
+        name="Hammered Member", phone="9000000000", groupId=group.id, bcHolder="TEST", joinDate=join_date
+    ))
+    return group, member, join_date
+
+async def test_concurrent_payments_keep_counters_exact(db):
+    group, member, join_date = await _member_with_history(TASKS + 12)
+    payment = PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test")
+
+    await asyncio.gather(*(create_payment(payment) for _ in range(TASKS)))
+
+    stored = await get_member(member.id)
+    assert stored["emiPaidCount"] == TASKS
+    assert stored["pendingAmount"] == calculate_pending(join_date, EMI, TASKS)
+
+async def test_concurrent_deletes_keep_counters_exact(db):
+    group, member, join_date = await _member_with_history(TASKS + 12)
+    payment = PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test")
+    created = await asyncio.gather(*(create_payment(payment) for _ in range(TASKS)))
+
+    await asyncio.gather(*(delete_payment(p.id) for p in created[:TASKS // 2]))
+
+    stored = await get_member(member.id)
+    assert stored["emiPaidCount"] == TASKS - TASKS // 2
+    assert stored["pendingAmount"] == calculate_pending(join_date, EMI, TASKS - TASKS // 2)
+
+async def test_payment_for_another_group_is_rejected(db):
+    group, member, join_date = await _member_with_history(3)
+    other = await create_group(GroupCreate(name="Other", totalChitAmount=10_000, maxMembers=10))
+    before = await get_member(member.id)
+
+    with pytest.raises(HTTPException) as error:
+        await create_payment(PaymentCreate(groupId=other.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test"))
+
+    assert error.value.status_code == 400
+    after = await get_member(member.id)
+    assert after["emiPaidCount"] == before["emiPaidCount"]
+    assert after["pendingAmount"] == before["pendingAmount"]
+    assert await db.payments.count_documents({}) == 0
+
+async def test_payment_for_unknown_member_is_rejected(db):
+    group, member, join_date = await _member_with_history(3)
+
+    with pytest.raises(HTTPException) as error:
+        await create_payment(PaymentCreate(groupId=group.id, memberId="missing", amount=EMI, emiNo=1, paidBy="test"))
+
+    assert error.value.status_code == 404
+    assert await db.payments.count_documents({}) == 0
+
+async def test_payment_ignores_a_stale_cached_emi(db):
+    group, member, join_date = await _member_with_history(3)
+    await get_group(group.id)
+    # Another worker changed the EMI; this worker's cache still holds the old one
+    await db.groups.update_one({"id": group.id}, {"$set": {"emiAmount": EMI * 2}})
+    await bump_version("groups")
+
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI * 2, emiNo=1, paidBy="test"))
+
+    stored = await get_member(member.id)
+    assert stored["pendingAmount"] == calculate_pending(to_datetime(stored["joinDate"]), EMI * 2, 1)
+    assert await get_stats() == await aggregate_dashboard_stats()
+
+async def test_payment_with_a_cached_group_is_one_counters_write(db, monkeypatch):
+    group, member, join_date = await _member_with_history(3)
+    await get_stats()
+    await get_group(group.id)
+    versions = await get_versions("members", "stats")
+    calls = []
+
+    def counting(collection, method):
+        original = getattr(collection, method)
+        async def call(*args, **kwargs):
+            calls.append((collection.name, method))
+            return await original(*args, **kwargs)
+        monkeypatch.setattr(collection, method, call)
+
+    for collection in (database.groups_collection, database.counters_collection):
+        for method in ("find_one", "find_one_and_update", "update_one"):
+            counting(collection, method)
+
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test"))
+
+    assert calls == [("counters", "find_one_and_update")]
+    after = await get_versions("members", "stats")
+    assert after == {"members": versions["members"] + 1, "stats": versions["stats"] + 1}
+    assert await get_stats() == await aggregate_dashboard_stats()
+
+async def test_bulk_payments_fail_row_by_row(db):
+    group, member, join_date = await _member_with_history(3)
+    other = await create_group(GroupCreate(name="Other", totalChitAmount=10_000, maxMembers=10))
+    row = {"groupId": group.id, "memberId": member.id, "amount": EMI, "emiNo": 1, "paidBy": "test"}
+    await get_stats()
+
+    result = await create_payments_bulk([
+        row,
+        {**row, "amount": "not a number"},
+        {**row, "groupId": other.id},
+        {k: v for k, v in row.items() if k != "memberId"},
+        {**row, "memberId": "missing"},
+        row,
+    ])
+
+    assert (result.created, result.failed) == (2, 4)
+    assert [(r.index, r.status) for r in result.results] == [
+        (0, "created"), (1, "error"), (2, "error"), (3, "error"), (4, "error"), (5, "created")
+    ]
+    assert "amount" in result.results[1].detail
+    assert result.results[2].detail == "Member does not belong to this group"
+    assert "memberId" in result.results[3].detail
+    assert result.results[4].detail == "Member not found"
+    stored = await get_member(member.id)
+    assert stored["emiPaidCount"] == 2
+    assert stored["pendingAmount"] == calculate_pending(join_date, EMI, 2)
+    assert await db.payments.count_documents({}) == 2
+    assert await get_stats() == await aggregate_dashboard_stats()
+
+async def test_date_filter_with_an_offset_matches_local_payment_dates(db, monkeypatch):
+    # paymentDate is stored as the server's local time; this server is on EST (UTC-5)
+    await db.payments.insert_many([
+        {"id": "morning", "paymentDate": datetime(2024, 1, 15, 9, 0)},
+        {"id": "evening", "paymentDate": datetime(2024, 1, 15, 20, 0)},
+    ])
+    ist = timezone(timedelta(hours=5, minutes=30))
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        # 08:30-19:00 EST
+        payments = await get_payments(
+            Response(), limit=None, after=None, fields="id",
+            from_date=datetime(2024, 1, 15, 19, 0, tzinfo=ist),
+            to_date=datetime(2024, 1, 16, 5, 30, tzinfo=ist)
+        )
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    assert [payment["id"] for payment in json.loads(payments.body)] == ["morning"]
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import GroupCreate, MemberCreate, PaymentCreate
+from routes.groups import create_group
+from routes.members import create_member
+from routes.payments import create_payment
+from routes.tally import get_tally
+
+pytestmark = pytest.mark.anyio
+
+EMI = 10_000
+
+async def _tally(**filters):
+    params = {"groupId": None, "name": None, "pendingOnly": False, "order": "desc", "limit": 100, "after": None}
+    return await get_tally(**{**params, **filters})
+
+async def test_penalties_total_covers_every_filtered_member(db):
+    group = await create_group(GroupCreate(name="Tally", totalChitAmount=EMI * 10, maxMembers=10))
+    for i, months in enumerate([0, 2, 5]):
+        member = await create_member(MemberCreate(
+            name=f"Member {i}", phone=f"90000000{i:02d}", groupId=group.id, bcHolder="TEST",
+            joinDate=datetime.now() - timedelta(days=31 * months)
+        ))
+    # Up to date for the current month: pending, but not late
+    await create_payment(PaymentCreate(groupId=group.id, memberId=member.id, amount=EMI, emiNo=1, paidBy="test"))
+    await db.members.update_one({"id": member.id}, {"$set": {"emiPaidCount": 5, "pendingAmount": EMI}})
+
+    first_page = await _tally(limit=1)
+    everyone = await _tally()
+
+    # Only Member 1 has paid fewer EMIs than the months since joining
+    late = next(m for m in everyone.items if m.name == "Member 1")
+    expected = round(late.pendingAmount * 0.03)
+    assert expected > 0
+    assert len(first_page.items) == 1
+    assert first_page.totalPenalties == everyone.totalPenalties == expected